@@ -1,4 +1,6 @@
+import hashlib
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -65,6 +67,45 @@ DATABASES = {
     }
 }
 
+# Cache (TASKS_CACHE_BACKEND=file or locmem)
+# The file cache is shared by every process on the host, so a write handled
+# by one worker (or a management command) invalidates fragments everywhere.
+# Its default directory is derived from the database, so other checkouts and
+# databases on the same host never see these per-user keys.
+# locmem is per-process: only use it with a single worker, otherwise other
+# workers serve stale fragments for up to TASKS_FRAGMENT_CACHE_TIMEOUT.
+TASKS_CACHE_BACKEND = os.getenv('TASKS_CACHE_BACKEND', 'file')
+TASKS_CACHE_LOCATION = os.getenv('TASKS_CACHE_LOCATION') or os.path.join(
+    tempfile.gettempdir(),
+    'aitaskmanager-cache-' + hashlib.md5(str(DATABASES['default']['NAME']).encode()).hexdigest()[:12],
+)
+
+if TASKS_CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'aitaskmanager',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': TASKS_CACHE_LOCATION,
+        }
+    }
+
+TASKS_CACHE_ALIAS = 'default'
+TASKS_FRAGMENT_CACHE_TIMEOUT = int(os.getenv('TASKS_FRAGMENT_CACHE_TIMEOUT', '300'))
+
+# Per-process columnar snapshots of each active user's tasks (tasks.snapshot)
+TASK_SNAPSHOTS = {
+    'ENABLED': os.getenv('TASK_SNAPSHOTS_ENABLED', 'False') == 'True',
+    'MAX_BYTES': int(os.getenv('TASK_SNAPSHOTS_MAX_BYTES', str(64 * 1024 * 1024))),
+    # Seconds before a snapshot is rebuilt even if no invalidation reached this process
+    'MAX_AGE': int(os.getenv('TASK_SNAPSHOTS_MAX_AGE', '60')),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -92,9 +133,42 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
 
+# AI backend (see tasks.ai_service.PROVIDERS)
+AI_PROVIDER = os.getenv('AI_PROVIDER', 'openai')
+
+# In-process parser used when AI_PROVIDER = 'local' (no network access)
+LOCAL_MODEL = {
+    'MIN_SAMPLES': 20,
+    'MAX_SAMPLES': 5000,
+    'MAX_AGE': 60 * 60,
+}
+
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 
+# Worker startup budget enforced by `manage.py bench_startup`
+STARTUP_BUDGET = {
+    'MAX_MS': float(os.getenv('STARTUP_BUDGET_MAX_MS', '1500')),
+    'MAX_RSS_MB': float(os.getenv('STARTUP_BUDGET_MAX_RSS_MB', '150')),
+}
+
+# Per-user AI call limits: endpoint -> (calls, window in seconds).
+# Over a limit or the daily token quota, parsing falls back to keywords.
+AI_RATE_LIMITS = {
+    'default': (20, 60),
+    'quick_add': (10, 60),
+    'task_form': (10, 60),
+    'api_parse': (30, 60),
+}
+AI_DAILY_TOKEN_QUOTA = int(os.getenv('AI_DAILY_TOKEN_QUOTA', '50000'))
+# Seconds between background flushes of each process's AI usage counters to
+# the database; 0 flushes inline on every call. Other workers' usage is seen
+# at most this late (see tasks.ratelimit).
+AI_COUNTER_FLUSH_INTERVAL = float(os.getenv('AI_COUNTER_FLUSH_INTERVAL', '1.0'))
+
+# Token budget for the task digest sent with recommendation requests
+AI_RECOMMENDATION_PROMPT_TOKENS = int(os.getenv('AI_RECOMMENDATION_PROMPT_TOKENS', '300'))
+
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -105,4 +179,16 @@ REST_FRAMEWORK = {
     ],
 }
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Due-date reminders (manage.py run_reminders)
+TASK_REMINDERS = {
+    'SINK': os.getenv('TASK_REMINDER_SINK', 'tasks.reminders.LogSink'),
+    'PATH': os.getenv('TASK_REMINDER_PATH', str(BASE_DIR / 'reminders.jsonl')),
+    'LEAD_TIME': 15 * 60,
+    'HORIZON': 60 * 60,
+}
+
+
+# Finished tasks untouched for this many days are moved to the archive (manage.py archive_tasks)
+TASK_ARCHIVE_AFTER_DAYS = int(os.getenv('TASK_ARCHIVE_AFTER_DAYS', '30'))
@@ -1,172 +1,284 @@
-import openai
 import os
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import SimpleLazyObject, cached_property
+from django.utils.module_loading import import_string
 import json
 from datetime import datetime, timedelta
 import re
 
-class AITaskService:
+from . import digest, ratelimit
+
+PARSE_PROMPT = """
+Parse this task description and return JSON with:
+- title: A clear task title
+- description: Expanded description if needed
+- priority: LOW, MEDIUM, HIGH, or URGENT
+- estimated_duration: Estimated time in minutes
+- due_date: Date in YYYY-MM-DD format if mentioned
+- category_suggestion: Suggested category
+
+Text: "{text}"
+
+Return only JSON.
+"""
+
+PARSE_MAX_TOKENS = 200
+
+RECOMMENDATION_PROMPT = """Based on this summary of the user's tasks, provide productivity recommendations:
+{digest}
+
+Return recommendations as a list of suggestions."""
+
+PRIORITY_SCORES = {
+    'LOW': 0.25,
+    'MEDIUM': 0.5,
+    'HIGH': 0.75,
+    'URGENT': 1.0
+}
+
+def priority_score(priority):
+    return PRIORITY_SCORES.get(priority, 0.5)
+
+def keyword_parse(text):
+    """Keyword-based parse plus the set of fields a keyword actually matched
+
+    Unmatched fields hold defaults, which callers (the fallback parser,
+    tasks.local_model) may fill in from elsewhere.
+    """
+    # Simple keyword-based parsing
+    text_lower = text.lower()
+    matched = set()
+
+    # Priority detection
+    priority_keywords = {
+        'urgent': 'URGENT',
+        'asap': 'URGENT',
+        'important': 'HIGH',
+        'high priority': 'HIGH',
+        'medium': 'MEDIUM',
+        'low': 'LOW',
+        'whenever': 'LOW'
+    }
+
+    priority = 'MEDIUM'
+    for keyword, pri in priority_keywords.items():
+        if keyword in text_lower:
+            priority = pri
+            matched.add('priority')
+            break
+
+    # Duration estimation (simple heuristic)
+    duration = 30  # default 30 minutes
+    duration_patterns = [
+        (r'(\d+)\s*hour', lambda x: int(x) * 60),
+        (r'(\d+)\s*hr', lambda x: int(x) * 60),
+        (r'(\d+)\s*min', lambda x: int(x)),
+        (r'quick', lambda x: 15),
+        (r'long', lambda x: 120),
+    ]
+
+    for pattern, converter in duration_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            duration = converter(match.group(1) if match.groups() else None)
+            matched.add('estimated_duration')
+            break
+
+    # Category suggestion
+    categories = {
+        'work': ['meeting', 'report', 'project', 'work', 'office'],
+        'personal': ['buy', 'shopping', 'grocery', 'personal'],
+        'health': ['exercise', 'gym', 'doctor', 'health', 'fitness'],
+        'learning': ['study', 'read', 'learn', 'course', 'book'],
+        'home': ['clean', 'home', 'house', 'repair']
+    }
+
+    category = 'General'
+    for cat, keywords in categories.items():
+        if any(keyword in text_lower for keyword in keywords):
+            category = cat.capitalize()
+            matched.add('category_suggestion')
+            break
+
+    return {
+        'title': text[:50] + ('...' if len(text) > 50 else ''),
+        'description': text,
+        'priority': priority,
+        'estimated_duration': duration,
+        'due_date': None,
+        'category_suggestion': category
+    }, matched
+
+# AI backends by name; values are dotted paths so a backend's
+# dependencies are only imported when it is selected.
+PROVIDERS = {
+    'openai': 'tasks.ai_service.OpenAIProvider',
+    'local': 'tasks.local_model.LocalModelProvider',
+}
+
+_provider_instances = {}
+
+def register_provider(name, provider):
+    """Register a provider class (or dotted path to one) under ``name``"""
+    PROVIDERS[name] = provider
+    _provider_instances.pop(name, None)
+
+def get_provider(name=None):
+    """Return the provider selected by ``name`` or settings.AI_PROVIDER"""
+    name = name or getattr(settings, 'AI_PROVIDER', 'openai')
+    if name not in _provider_instances:
+        if name not in PROVIDERS:
+            raise ImproperlyConfigured(
+                f"Unknown AI_PROVIDER '{name}'; expected one of: {', '.join(sorted(PROVIDERS))}"
+            )
+        provider = PROVIDERS[name]
+        if isinstance(provider, str):
+            provider = import_string(provider)
+        _provider_instances[name] = provider()
+    return _provider_instances[name]
+
+# A provider has ``available`` and ``metered`` (whether calls cost tokens and
+# count against rate limits), ``parse(text, user=None)``, and optionally
+# ``parse_many(texts, user=None)`` and ``recommend(digest_text)``.
+
+class OpenAIProvider:
+    """Chat completions through the OpenAI SDK, imported on first request"""
+    model = "gpt-3.5-turbo"
+    metered = True
+    
     def __init__(self):
         self.api_key = settings.OPENAI_API_KEY
-        if self.api_key:
-            openai.api_key = self.api_key
     
-    def parse_natural_language(self, text):
-        """Parse natural language to extract task details"""
-        if not self.api_key:
+    @property
+    def available(self):
+        return bool(self.api_key)
+    
+    @cached_property
+    def client(self):
+        import openai
+        openai.api_key = self.api_key
+        return openai
+    
+    def _chat(self, system, prompt, max_tokens, temperature):
+        response = self.client.ChatCompletion.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+    
+    def parse(self, text, user=None):
+        content = self._chat(
+            "You are a task parsing assistant. Return only JSON.",
+            PARSE_PROMPT.format(text=text),
+            max_tokens=PARSE_MAX_TOKENS,
+            temperature=0.3
+        )
+        return json.loads(content)
+    
+    def recommend(self, digest_text):
+        return self._chat(
+            "You are a productivity coach.",
+            RECOMMENDATION_PROMPT.format(digest=digest_text),
+            max_tokens=150,
+            temperature=0.7
+        )
+
+class AITaskService:
+    @property
+    def provider(self):
+        # Looked up on every call so AI_PROVIDER and register_provider()
+        # changes reach the module-level singleton
+        return get_provider()
+    
+    def parse_natural_language(self, text, user=None, endpoint=None):
+        """Parse natural language to extract task details
+        
+        When ``endpoint`` is given and the provider is metered, the call
+        counts against the user's rate limit for ``endpoint`` and their
+        daily token quota; over either, the local fallback parser is used.
+        """
+        provider = self.provider
+        if not provider.available:
             return self._fallback_parse(text)
         
+        if endpoint is not None and user is not None and provider.metered:
+            tokens = digest.estimate_tokens(PARSE_PROMPT.format(text=text)) + PARSE_MAX_TOKENS
+            if not ratelimit.allow(user.id, endpoint, tokens):
+                return self._fallback_parse(text)
+        
         try:
-            prompt = f"""
-            Parse this task description and return JSON with:
-            - title: A clear task title
-            - description: Expanded description if needed
-            - priority: LOW, MEDIUM, HIGH, or URGENT
-            - estimated_duration: Estimated time in minutes
-            - due_date: Date in YYYY-MM-DD format if mentioned
-            - category_suggestion: Suggested category
-            
-            Text: "{text}"
-            
-            Return only JSON.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a task parsing assistant. Return only JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0.3
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            return result
-            
+            return provider.parse(text, user=user)
         except Exception as e:
             print(f"AI parsing error: {e}")
             return self._fallback_parse(text)
     
+    def parse_batch(self, texts, user=None):
+        """Parse many texts, in one call when the provider supports batching"""
+        provider = self.provider
+        if not provider.available or not hasattr(provider, 'parse_many'):
+            return [self.parse_natural_language(text, user=user) for text in texts]
+        
+        try:
+            return provider.parse_many(texts, user=user)
+        except Exception as e:
+            print(f"AI parsing error: {e}")
+            return [self._fallback_parse(text) for text in texts]
+    
     def _fallback_parse(self, text):
         """Fallback parsing without AI"""
-        import random
-        from datetime import datetime, timedelta
-        
-        # Simple keyword-based parsing
-        text_lower = text.lower()
-        
-        # Priority detection
-        priority_keywords = {
-            'urgent': 'URGENT',
-            'asap': 'URGENT',
-            'important': 'HIGH',
-            'high priority': 'HIGH',
-            'medium': 'MEDIUM',
-            'low': 'LOW',
-            'whenever': 'LOW'
-        }
-        
-        priority = 'MEDIUM'
-        for keyword, pri in priority_keywords.items():
-            if keyword in text_lower:
-                priority = pri
-                break
-        
-        # Duration estimation (simple heuristic)
-        duration = 30  # default 30 minutes
-        duration_patterns = [
-            (r'(\d+)\s*hour', lambda x: int(x) * 60),
-            (r'(\d+)\s*hr', lambda x: int(x) * 60),
-            (r'(\d+)\s*min', lambda x: int(x)),
-            (r'quick', lambda x: 15),
-            (r'long', lambda x: 120),
-        ]
-        
-        for pattern, converter in duration_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                duration = converter(match.group(1))
-                break
-        
-        # Category suggestion
-        categories = {
-            'work': ['meeting', 'report', 'project', 'work', 'office'],
-            'personal': ['buy', 'shopping', 'grocery', 'personal'],
-            'health': ['exercise', 'gym', 'doctor', 'health', 'fitness'],
-            'learning': ['study', 'read', 'learn', 'course', 'book'],
-            'home': ['clean', 'home', 'house', 'repair']
-        }
+        return keyword_parse(text)[0]
+    
+    def get_productivity_recommendations(self, user_tasks, stats=None):
+        """Generate productivity recommendations based on user's tasks
         
-        category = 'General'
-        for cat, keywords in categories.items():
-            if any(keyword in text_lower for keyword in keywords):
-                category = cat.capitalize()
-                break
+        ``stats`` is a precomputed digest (see tasks.digest); when omitted
+        it is aggregated from ``user_tasks``.
+        """
+        if stats is None:
+            stats = digest.build_stats(user_tasks)
         
-        return {
-            'title': text[:50] + ('...' if len(text) > 50 else ''),
-            'description': text,
-            'priority': priority,
-            'estimated_duration': duration,
-            'due_date': None,
-            'category_suggestion': category
-        }
-    
-    def get_productivity_recommendations(self, user_tasks):
-        """Generate productivity recommendations based on user's tasks"""
-        if not self.api_key:
-            return self._fallback_recommendations(user_tasks)
+        provider = self.provider
+        if not provider.available or not hasattr(provider, 'recommend'):
+            return self._fallback_recommendations(stats)
         
         try:
-            task_summary = "\n".join([
-                f"- {task.title} (Priority: {task.priority}, Status: {task.status})"
-                for task in user_tasks[:10]  # Limit to recent tasks
-            ])
-            
-            prompt = f"""
-            Based on these tasks, provide productivity recommendations:
-            {task_summary}
-            
-            Return recommendations as a list of suggestions.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a productivity coach."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=150,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
-            
+            return provider.recommend(digest.format_digest(stats))
         except Exception as e:
             print(f"AI recommendation error: {e}")
-            return self._fallback_recommendations(user_tasks)
+            return self._fallback_recommendations(stats)
     
-    def _fallback_recommendations(self, user_tasks):
+    def _fallback_recommendations(self, stats):
         """Fallback recommendations without AI"""
-        if not user_tasks:
+        if not stats['total']:
             return "Start by adding some tasks to get personalized recommendations!"
         
-        pending_tasks = [t for t in user_tasks if t.status != 'DONE']
-        high_priority = [t for t in pending_tasks if t.priority in ['HIGH', 'URGENT']]
+        pending_tasks = stats['status']['TODO'] + stats['status']['IN_PROGRESS']
+        high_priority = stats['priority']['HIGH'] + stats['priority']['URGENT']
         
         recommendations = []
         
         if high_priority:
-            recommendations.append(f"Focus on your {len(high_priority)} high-priority tasks first.")
+            recommendations.append(f"Focus on your {high_priority} high-priority tasks first.")
         
-        if len(pending_tasks) > 10:
+        if pending_tasks > 10:
             recommendations.append("Consider breaking down large tasks into smaller, manageable ones.")
         
-        if any(t.is_overdue for t in pending_tasks):
+        if any(stats['overdue'].values()):
             recommendations.append("Address overdue tasks to reduce stress.")
         
+        estimates = stats['estimates']
+        if estimates['timed'] and estimates['error'] > 15:
+            recommendations.append(
+                f"Your tasks take about {estimates['error']:.0f} minutes longer than estimated; plan with more buffer."
+            )
+        
         return "\n".join(recommendations) if recommendations else "You're doing great! Keep up the good work."
 
-# Singleton instance
-ai_service = AITaskService()
\ No newline at end of file
+# Singleton instance, built on first use
+ai_service = SimpleLazyObject(AITaskService)
\ No newline at end of file
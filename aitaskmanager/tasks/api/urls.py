@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('tasks/', views.TaskListAPI.as_view(), name='api_task_list'),
     path('tasks/<int:pk>/', views.TaskDetailAPI.as_view(), name='api_task_detail'),
+    path('labels/', views.LabelCountAPI.as_view(), name='api_label_counts'),
     path('insights/', views.InsightListAPI.as_view(), name='api_insight_list'),
     path('ai/parse/', views.AIParseView.as_view(), name='api_ai_parse'),
 ]
\ No newline at end of file
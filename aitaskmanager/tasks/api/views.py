@@ -1,18 +1,57 @@
 from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.contrib.auth.models import User
+from django.utils import timezone
 from tasks.models import Task, ProductivityInsight
 from tasks.serializers import TaskSerializer, InsightSerializer
 from tasks.ai_service import ai_service
+from tasks.labels import filter_by_labels, label_counts, parse_label_names
+from tasks.snapshot import get_snapshot
 import json
 
+def category_param(params):
+    """The ?category= filter as an int (None when absent); 400 if it isn't one"""
+    value = params.get('category')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({'category': ['A valid integer is required.']})
+
 class TaskListAPI(generics.ListCreateAPIView):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user)
+        params = self.request.query_params
+        tasks = Task.objects.filter(user=self.request.user).prefetch_related('labels')
+        if params.get('status'):
+            tasks = tasks.filter(status=params['status'])
+        if params.get('priority'):
+            tasks = tasks.filter(priority=params['priority'])
+        category_id = category_param(params)
+        if category_id is not None:
+            tasks = tasks.filter(category_id=category_id)
+        names = parse_label_names(params.get('labels', ''))
+        match = 'all' if params.get('match') == 'all' else 'any'
+        return filter_by_labels(tasks, self.request.user, names, match)
+    
+    def list(self, request, *args, **kwargs):
+        # ?compact=1 answers straight from the in-memory snapshot when enabled
+        params = request.query_params
+        category_id = category_param(params)
+        task_snapshot = None
+        if params.get('compact') and not params.get('labels'):
+            task_snapshot = get_snapshot(request.user)
+        if task_snapshot is None:
+            return super().list(request, *args, **kwargs)
+        
+        now = timezone.now()
+        rows = task_snapshot.filter(params.get('status'), params.get('priority'), category_id)
+        return Response([task_snapshot.row(i, now) for i in rows])
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -22,7 +61,16 @@ class TaskDetailAPI(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user)
+        return Task.objects.filter(user=self.request.user).prefetch_related('labels')
+
+class LabelCountAPI(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        return Response([
+            {'name': name, 'task_count': task_count}
+            for name, task_count in label_counts(request.user)
+        ])
 
 class InsightListAPI(generics.ListAPIView):
     serializer_class = InsightSerializer
@@ -39,5 +87,5 @@ class AIParseView(APIView):
         if not text:
             return Response({'error': 'No text provided'}, status=400)
         
-        parsed_data = ai_service.parse_natural_language(text)
+        parsed_data = ai_service.parse_natural_language(text, user=request.user, endpoint='api_parse')
         return Response(parsed_data)
\ No newline at end of file
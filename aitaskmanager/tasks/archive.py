@@ -0,0 +1,107 @@
+"""Cold archive for finished tasks.
+
+DONE and ARCHIVED tasks that have not changed for a while are copied into
+ArchivedTask together with their label names and deleted from Task, in
+batches, so the hot table only grows with active work.
+"""
+import csv
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Task, ArchivedTask
+
+FINISHED_STATUSES = ['DONE', 'ARCHIVED']
+
+EXPORT_FIELDS = [
+    'original_id', 'title', 'description', 'category_name', 'labels', 'priority', 'status',
+    'due_date', 'estimated_duration', 'actual_duration', 'created_at', 'updated_at', 'completed_at',
+]
+
+COPIED_FIELDS = [
+    'title', 'description', 'priority', 'status', 'due_date', 'estimated_duration',
+    'actual_duration', 'created_at', 'updated_at', 'completed_at', 'ai_priority_score',
+    'ai_category_suggestion', 'ai_estimated_duration',
+]
+
+
+def archive_cutoff(older_than=None):
+    """Last-update time before which finished tasks are archived"""
+    if older_than is None:
+        older_than = timedelta(days=getattr(settings, 'TASK_ARCHIVE_AFTER_DAYS', 30))
+    return timezone.now() - older_than
+
+
+def archivable_tasks(older_than=None, cutoff=None):
+    """Finished tasks untouched for ``older_than`` (defaults to TASK_ARCHIVE_AFTER_DAYS)"""
+    cutoff = cutoff or archive_cutoff(older_than)
+    return Task.objects.filter(status__in=FINISHED_STATUSES, updated_at__lt=cutoff)
+
+
+def _to_archived(task):
+    archived = ArchivedTask(
+        original_id=task.id,
+        user_id=task.user_id,
+        category_name=task.category.name if task.category else '',
+        labels=[label.name for label in task.labels.all()],
+    )
+    for field in COPIED_FIELDS:
+        setattr(archived, field, getattr(task, field))
+    return archived
+
+
+def archive_batch(task_ids, older_than=None, cutoff=None):
+    """Move the given tasks into the archive; returns the number moved
+
+    Status and age are checked again under the row locks, so a task edited
+    since its id was selected stays in Task.
+    """
+    with transaction.atomic():
+        tasks = list(
+            archivable_tasks(older_than, cutoff).select_for_update()
+            .filter(id__in=task_ids)
+            .select_related('category')
+            .prefetch_related('labels')
+        )
+        if not tasks:
+            return 0
+        ArchivedTask.objects.bulk_create([_to_archived(task) for task in tasks])
+        Task.objects.filter(id__in=[task.id for task in tasks]).delete()
+    return len(tasks)
+
+
+def archive_tasks(older_than=None, batch_size=500):
+    """Archive every eligible task in batches of ``batch_size``; returns the total moved"""
+    cutoff = archive_cutoff(older_than)
+    queryset = archivable_tasks(cutoff=cutoff).order_by('id').values_list('id', flat=True)
+    total = 0
+    last_id = 0
+    while True:
+        task_ids = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not task_ids:
+            return total
+        total += archive_batch(task_ids, cutoff=cutoff)
+        last_id = task_ids[-1]
+
+
+def search_archive(user, query=''):
+    archived = ArchivedTask.objects.filter(user=user)
+    if query:
+        archived = archived.filter(
+            Q(title__icontains=query) | Q(description__icontains=query)
+            | Q(category_name__icontains=query) | Q(labels__icontains=query)
+        )
+    return archived
+
+
+def export_csv(archived, out):
+    """Write archived tasks as CSV to a file-like object"""
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_FIELDS)
+    for task in archived.iterator(chunk_size=1000):
+        row = [getattr(task, field) for field in EXPORT_FIELDS]
+        row[EXPORT_FIELDS.index('labels')] = ','.join(task.labels)
+        writer.writerow(row)
@@ -0,0 +1,87 @@
+"""Per-user fragment cache for the task pages.
+
+Every cached fragment is keyed by the user and by a version number for each
+scope it depends on (tasks, categories, insights). Writes bump the version of
+the scopes they touch instead of deleting keys, so all fragments built from
+that data are invalidated at once and the stale entries age out on their own.
+
+Versions live in the configured cache, so invalidation only reaches other
+processes when that cache is shared between them (the file backend is).
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+TASKS = 'tasks'
+CATEGORIES = 'categories'
+INSIGHTS = 'insights'
+
+DEFAULT_TIMEOUT = getattr(settings, 'TASKS_FRAGMENT_CACHE_TIMEOUT', 300)
+
+_MISSING = object()
+
+
+def get_cache():
+    return caches[getattr(settings, 'TASKS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(user_id, scope):
+    return f'tasks:version:{user_id}:{scope}'
+
+
+def _new_version():
+    # A fresh random value rather than a counter: incr() is get-then-set on
+    # some backends (e.g. the file cache), so two concurrent bumps could both
+    # land on the same number, and an evicted counter could restart at a
+    # value older fragments were stored under.
+    return uuid.uuid4().hex
+
+
+def get_versions(user_id, scopes):
+    """Return the current version of each scope for a user"""
+    cache = get_cache()
+    keys = [_version_key(user_id, scope) for scope in scopes]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = _new_version()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions.append(version)
+    return versions
+
+
+def bump(user_id, *scopes):
+    """Invalidate every fragment of a user that depends on the given scopes"""
+    get_cache().set_many({_version_key(user_id, scope): _new_version() for scope in scopes}, None)
+
+
+def fragment_key(user_id, name, scopes, *parts):
+    versions = '.'.join(str(v) for v in get_versions(user_id, scopes))
+    key = f'tasks:fragment:{user_id}:{name}:{versions}'
+    if parts:
+        digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+        key = f'{key}:{digest}'
+    return key
+
+
+def cached_fragment(user_id, name, scopes, builder, *parts, timeout=DEFAULT_TIMEOUT):
+    """Return a cached fragment, building and storing it on a miss.
+
+    ``parts`` further distinguish fragments of the same name (e.g. the active
+    filters). ``timeout`` may be a callable receiving the built value, for
+    fragments whose freshness also depends on the clock.
+    """
+    cache = get_cache()
+    key = fragment_key(user_id, name, scopes, *parts)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = builder()
+        seconds = timeout(value) if callable(timeout) else timeout
+        if seconds is None or seconds > 0:
+            cache.set(key, value, seconds)
+    return value
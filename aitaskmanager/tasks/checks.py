@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def check_ai_provider(app_configs, **kwargs):
+    from .ai_service import PROVIDERS
+
+    name = getattr(settings, 'AI_PROVIDER', 'openai')
+    if name not in PROVIDERS:
+        return [Error(
+            f"Unknown AI_PROVIDER '{name}'.",
+            hint=f"Use one of: {', '.join(sorted(PROVIDERS))}.",
+            id='tasks.E001',
+        )]
+    return []
@@ -0,0 +1,125 @@
+"""Compact statistical digest of a task set for the recommendation prompt.
+
+The digest is computed with aggregate queries over every task instead of
+listing individual tasks, then rendered to a few lines that fit a token
+budget. The per-user digest is cached until the user's tasks change.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, F, Q
+from django.db.models.functions import Abs
+from django.utils import timezone
+
+from . import cache
+from .models import Task
+
+OPEN_STATUSES = ['TODO', 'IN_PROGRESS']
+
+STATUS_LABELS = dict(Task.STATUS_CHOICES)
+PRIORITY_LABELS = dict(Task.PRIORITY_CHOICES)
+PRIORITY_ORDER = ['URGENT', 'HIGH', 'MEDIUM', 'LOW']
+
+
+def build_stats(tasks):
+    """Aggregate a task queryset into a plain dict (two queries)"""
+    now = timezone.now()
+    is_open = Q(status__in=OPEN_STATUSES)
+    overdue = is_open & Q(due_date__lt=now)
+    timed = Q(actual_duration__isnull=False, estimated_duration__isnull=False)
+
+    aggregates = {'total': Count('id')}
+    for status in STATUS_LABELS:
+        aggregates[f'status_{status}'] = Count('id', filter=Q(status=status))
+    for priority in PRIORITY_LABELS:
+        aggregates[f'priority_{priority}'] = Count('id', filter=is_open & Q(priority=priority))
+    aggregates.update(
+        overdue_day=Count('id', filter=overdue & Q(due_date__gte=now - timedelta(days=1))),
+        overdue_week=Count('id', filter=overdue & Q(due_date__lt=now - timedelta(days=1),
+                                                   due_date__gte=now - timedelta(days=7))),
+        overdue_older=Count('id', filter=overdue & Q(due_date__lt=now - timedelta(days=7))),
+        due_soon=Count('id', filter=is_open & Q(due_date__gte=now, due_date__lt=now + timedelta(days=7))),
+        timed=Count('id', filter=timed),
+        over_estimate=Count('id', filter=timed & Q(actual_duration__gt=F('estimated_duration'))),
+        estimate_error=Avg(F('actual_duration') - F('estimated_duration'), filter=timed),
+        estimate_abs_error=Avg(Abs(F('actual_duration') - F('estimated_duration')), filter=timed),
+    )
+    row = tasks.order_by().aggregate(**aggregates)
+
+    categories = (
+        tasks.order_by()
+        .values('category__name')
+        .annotate(open=Count('id', filter=is_open), done=Count('id', filter=Q(status='DONE')))
+        .order_by('-open', '-done')
+    )
+
+    return {
+        'total': row['total'],
+        'status': {status: row[f'status_{status}'] for status in STATUS_LABELS},
+        'priority': {priority: row[f'priority_{priority}'] for priority in PRIORITY_ORDER},
+        'overdue': {
+            'day': row['overdue_day'],
+            'week': row['overdue_week'],
+            'older': row['overdue_older'],
+        },
+        'due_soon': row['due_soon'],
+        'estimates': {
+            'timed': row['timed'],
+            'over': row['over_estimate'],
+            'error': row['estimate_error'],
+            'abs_error': row['estimate_abs_error'],
+        },
+        'categories': [
+            (c['category__name'] or 'Uncategorized', c['open'], c['done']) for c in categories
+        ],
+    }
+
+
+def user_stats(user):
+    """Cached stats over all of a user's tasks"""
+    return cache.cached_fragment(
+        user.id, 'task_stats', [cache.TASKS, cache.CATEGORIES],
+        lambda: build_stats(Task.objects.filter(user=user)),
+    )
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def format_digest(stats, max_tokens=None):
+    """Render stats as prompt lines, dropping detail until they fit ``max_tokens``"""
+    if max_tokens is None:
+        max_tokens = getattr(settings, 'AI_RECOMMENDATION_PROMPT_TOKENS', 300)
+
+    status = ', '.join(f'{STATUS_LABELS[s]} {n}' for s, n in stats['status'].items())
+    lines = [f"Tasks: {stats['total']} total | {status}"]
+    lines.append('Open by priority: ' + ', '.join(
+        f'{PRIORITY_LABELS[p]} {n}' for p, n in stats['priority'].items()
+    ))
+
+    overdue = stats['overdue']
+    lines.append(
+        f"Overdue: {sum(overdue.values())} (<1 day {overdue['day']}, 1-7 days {overdue['week']}, "
+        f">7 days {overdue['older']}); due in next 7 days: {stats['due_soon']}"
+    )
+
+    estimates = stats['estimates']
+    if estimates['timed']:
+        lines.append(
+            f"Estimates: {estimates['timed']} timed tasks, actual minus estimated averages "
+            f"{estimates['error']:+.0f} min (abs {estimates['abs_error']:.0f} min), "
+            f"{estimates['over']} ran over"
+        )
+
+    categories = [f'{name} {n_open}/{n_done}' for name, n_open, n_done in stats['categories']]
+    while categories:
+        text = '\n'.join(lines + ['Categories (open/done): ' + ', '.join(categories)])
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        categories.pop()
+
+    while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop()
+    return '\n'.join(lines)
@@ -1,6 +1,6 @@
 from django import forms
 from .models import Task, Category
-from .ai_service import ai_service
+from .ai_service import ai_service, priority_score
 from django.utils import timezone
 
 class TaskForm(forms.ModelForm):
@@ -42,7 +42,9 @@ class TaskForm(forms.ModelForm):
         
         if use_natural_language and natural_language_input:
             # Parse natural language using AI
-            parsed_data = ai_service.parse_natural_language(natural_language_input)
+            parsed_data = ai_service.parse_natural_language(
+                natural_language_input, user=self.user, endpoint='task_form'
+            )
             
             # Update form fields with parsed data
             cleaned_data['title'] = parsed_data.get('title', cleaned_data.get('title'))
@@ -59,13 +61,7 @@ class TaskForm(forms.ModelForm):
         return cleaned_data
     
     def _calculate_priority_score(self, priority):
-        priority_scores = {
-            'LOW': 0.25,
-            'MEDIUM': 0.5,
-            'HIGH': 0.75,
-            'URGENT': 1.0
-        }
-        return priority_scores.get(priority, 0.5)
+        return priority_score(priority)
 
 class CategoryForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,105 @@
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .ai_service import ai_service
+from .models import Task, ArchivedTask, ProductivityInsight
+
+
+EMPTY_VALUES = {'tasks_completed': 0, 'total_focus_time': 0, 'average_task_duration': 0}
+
+
+def daily_values(*querysets):
+    """Insight metrics for each day tasks were updated, one grouped query per queryset
+    
+    Accepts Task and ArchivedTask querysets, which share the fields used here,
+    so days whose tasks were archived keep their history.
+    """
+    done = Q(status='DONE')
+    timed = done & Q(actual_duration__isnull=False)
+    totals = {}
+    for queryset in querysets:
+        rows = (
+            queryset.order_by()
+            .annotate(day=TruncDate('updated_at'))
+            .values('day')
+            .annotate(
+                tasks_completed=Count('id', filter=done),
+                total_focus_time=Coalesce(
+                    Sum(Coalesce('actual_duration', 'estimated_duration', Value(0)), filter=done), Value(0)
+                ),
+                duration_sum=Coalesce(Sum('actual_duration', filter=timed), Value(0)),
+                duration_count=Count('id', filter=timed),
+            )
+        )
+        for row in rows:
+            day = totals.setdefault(row['day'], [0, 0, 0, 0])
+            day[0] += row['tasks_completed']
+            day[1] += row['total_focus_time']
+            day[2] += row['duration_sum']
+            day[3] += row['duration_count']
+    
+    return {
+        day: {
+            'tasks_completed': completed,
+            'total_focus_time': focus,
+            'average_task_duration': duration_sum / duration_count if duration_count else 0,
+        }
+        for day, (completed, focus, duration_sum, duration_count) in totals.items()
+    }
+
+
+def build_insights(user, since, until=None, with_recommendations=True):
+    """Unsaved ProductivityInsight rows for every day in [since, until] with task activity
+    
+    Archived tasks count towards their days. Existing rows in the range are
+    reused (with their pk) so they can be passed to bulk_update; days whose
+    activity disappeared entirely are reset to zero.
+    """
+    until = until or timezone.now().date()
+    tasks = Task.objects.filter(user=user, updated_at__date__gte=since, updated_at__date__lte=until)
+    archived = ArchivedTask.objects.filter(user=user, updated_at__date__gte=since, updated_at__date__lte=until)
+    values = daily_values(tasks, archived)
+    active_days = set(tasks.annotate(day=TruncDate('updated_at')).values_list('day', flat=True).distinct())
+    existing = {
+        insight.date: insight
+        for insight in ProductivityInsight.objects.filter(user=user, date__gte=since, date__lte=until)
+    }
+    
+    insights = []
+    for day in sorted(set(values) | set(existing)):
+        insight = existing.get(day) or ProductivityInsight(user=user, date=day)
+        for field, value in values.get(day, EMPTY_VALUES).items():
+            setattr(insight, field, value)
+        # Recommendations come from live tasks; keep the stored text for archived days
+        if with_recommendations and day in active_days:
+            insight.recommendations = ai_service.get_productivity_recommendations(
+                tasks.filter(updated_at__date=day)
+            )
+        insights.append(insight)
+    return insights
+
+
+def generate_daily_insight(user):
+    """Generate daily productivity insight"""
+    today = timezone.now().date()
+    
+    # Get today's tasks
+    today_tasks = Task.objects.filter(
+        user=user,
+        updated_at__date=today
+    )
+    
+    values = dict(daily_values(today_tasks).get(today, EMPTY_VALUES))
+    
+    # Get AI recommendations
+    values['recommendations'] = ai_service.get_productivity_recommendations(today_tasks)
+    
+    # Create or update insight
+    insight, created = ProductivityInsight.objects.update_or_create(
+        user=user,
+        date=today,
+        defaults=values
+    )
+    
+    return insight
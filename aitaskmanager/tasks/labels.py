@@ -0,0 +1,61 @@
+from django.db.models import Count
+
+from . import cache
+from .models import Label, TaskLabel
+
+
+def parse_label_names(value):
+    """Split a comma-separated label string into unique, stripped names"""
+    names = []
+    for name in value.split(','):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def filter_by_labels(tasks, user, names, match='any'):
+    """Restrict tasks to those tagged with any (or all) of the given label names"""
+    if not names:
+        return tasks
+    label_ids = list(Label.objects.filter(user=user, name__in=names).values_list('id', flat=True))
+
+    if match == 'all':
+        if len(label_ids) < len(names):
+            return tasks.none()
+        task_ids = (
+            TaskLabel.objects.filter(label_id__in=label_ids)
+            .values('task_id')
+            .annotate(matched=Count('label_id'))
+            .filter(matched=len(label_ids))
+            .values('task_id')
+        )
+    else:
+        task_ids = TaskLabel.objects.filter(label_id__in=label_ids).values('task_id')
+
+    return tasks.filter(id__in=task_ids)
+
+
+def set_task_labels(task, names):
+    """Replace a task's labels, creating the user's Label rows as needed"""
+    existing = {label.name: label for label in Label.objects.filter(user_id=task.user_id, name__in=names)}
+    missing = [Label(user_id=task.user_id, name=name) for name in names if name not in existing]
+    if missing:
+        Label.objects.bulk_create(missing, ignore_conflicts=True)
+        existing.update(
+            (label.name, label) for label in Label.objects.filter(user_id=task.user_id, name__in=names)
+        )
+    task.labels.set([existing[name] for name in names])
+
+
+def label_counts(user):
+    """Cached (name, task count) pairs for a user's labels"""
+    return cache.cached_fragment(
+        user.id, 'label_counts', [cache.TASKS],
+        lambda: list(
+            Label.objects.filter(user=user)
+            .annotate(task_count=Count('task_labels'))
+            .order_by('name')
+            .values_list('name', 'task_count')
+        ),
+    )
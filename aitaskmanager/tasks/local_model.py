@@ -0,0 +1,196 @@
+"""In-process task parser trained on the user's own history.
+
+Selected with AI_PROVIDER = 'local'. Priority and category come from
+multinomial Naive Bayes classifiers and duration from per-token averages,
+all fitted on the user's existing tasks; due dates are tagged with rules.
+Everything runs in pure Python with no network access, and trained models
+are kept in the cache so every worker process can reuse them.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .ai_service import keyword_parse
+from .cache import get_cache
+from .models import Task
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+DEFAULTS = {
+    'MIN_SAMPLES': 20,         # tasks needed before a user's model is trained
+    'MAX_SAMPLES': 5000,       # most recent tasks used for training
+    'MAX_AGE': 60 * 60,        # seconds before a trained model is refitted
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'LOCAL_MODEL', {}).get(name, DEFAULTS[name])
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class NaiveBayes:
+    """Multinomial Naive Bayes over token lists"""
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.classes = []
+        self.log_prior = []
+        self.log_likelihood = {}
+
+    def fit(self, docs, labels):
+        class_docs = Counter(labels)
+        token_counts = defaultdict(Counter)
+        for tokens, label in zip(docs, labels):
+            token_counts[label].update(tokens)
+
+        self.classes = sorted(class_docs)
+        vocab = set().union(*token_counts.values()) if token_counts else set()
+        totals = [sum(token_counts[c].values()) + self.alpha * len(vocab) for c in self.classes]
+        self.log_prior = [math.log(class_docs[c] / len(labels)) for c in self.classes]
+        self.log_likelihood = {
+            token: tuple(
+                math.log((token_counts[c][token] + self.alpha) / total)
+                for c, total in zip(self.classes, totals)
+            )
+            for token in vocab
+        }
+        return self
+
+    def predict(self, tokens):
+        scores = list(self.log_prior)
+        for token in tokens:
+            likelihood = self.log_likelihood.get(token)
+            if likelihood is not None:
+                scores = [s + l for s, l in zip(scores, likelihood)]
+        return self.classes[max(range(len(scores)), key=scores.__getitem__)]
+
+
+class DurationModel:
+    """Duration as the count-weighted mean of per-token average durations"""
+
+    def fit(self, docs, durations):
+        sums = defaultdict(float)
+        counts = Counter()
+        for tokens, duration in zip(docs, durations):
+            for token in set(tokens):
+                sums[token] += duration
+                counts[token] += 1
+        self.token_mean = {token: (sums[token] / counts[token], counts[token]) for token in counts}
+        ordered = sorted(durations)
+        self.default = ordered[len(ordered) // 2] if ordered else 30
+        return self
+
+    def predict(self, tokens):
+        total = weight = 0
+        for token in set(tokens):
+            mean_count = self.token_mean.get(token)
+            if mean_count:
+                total += mean_count[0] * mean_count[1]
+                weight += mean_count[1]
+        return int(round(total / weight)) if weight else self.default
+
+
+def extract_due_date(text, now=None):
+    """Tag a due date in free text; returns a date or None"""
+    text = text.lower()
+    today = (now or timezone.now()).date()
+
+    match = re.search(r'\b(\d{4})-(\d{2})-(\d{2})\b', text)
+    if match:
+        try:
+            return today.replace(year=int(match.group(1)), month=int(match.group(2)), day=int(match.group(3)))
+        except ValueError:
+            pass
+    if re.search(r'\btoday\b|\btonight\b', text):
+        return today
+    if re.search(r'\btomorrow\b', text):
+        return today + timedelta(days=1)
+    match = re.search(r'\bin (\d+) (day|week)s?\b', text)
+    if match:
+        days = int(match.group(1)) * (7 if match.group(2) == 'week' else 1)
+        return today + timedelta(days=days)
+    if re.search(r'\bnext week\b', text):
+        return today + timedelta(days=7)
+    for index, weekday in enumerate(WEEKDAYS):
+        if re.search(rf'\b{weekday}\b', text):
+            return today + timedelta(days=(index - today.weekday() - 1) % 7 + 1)
+    return None
+
+
+class UserTaskModel:
+    """Priority, category and duration models fitted on one user's tasks"""
+
+    def fit(self, tasks):
+        docs = []
+        priorities = []
+        categorised = []
+        timed = []
+        for title, description, priority, category, actual, estimated in tasks:
+            tokens = tokenize(f'{title} {description}')
+            docs.append(tokens)
+            priorities.append(priority)
+            if category:
+                categorised.append((tokens, category))
+            if actual or estimated:
+                timed.append((tokens, actual or estimated))
+
+        self.priority = NaiveBayes().fit(docs, priorities)
+        self.category = NaiveBayes().fit(*zip(*categorised)) if categorised else None
+        self.duration = DurationModel().fit(*zip(*timed)) if timed else None
+        return self
+
+    @classmethod
+    def for_user(cls, user):
+        """The user's trained model, or None when they have too little history"""
+        cache = get_cache()
+        key = f'tasks:local_model:{user.id}'
+        model = cache.get(key)
+        if model is None:
+            rows = list(
+                Task.objects.filter(user=user)
+                .order_by('-created_at')
+                .values_list('title', 'description', 'priority', 'category__name',
+                             'actual_duration', 'estimated_duration')[:get_setting('MAX_SAMPLES')]
+            )
+            # Cache a False marker for users without enough history
+            model = cls().fit(rows) if len(rows) >= get_setting('MIN_SAMPLES') else False
+            cache.set(key, model, get_setting('MAX_AGE'))
+        return model or None
+
+
+class LocalModelProvider:
+    """AI provider backed by UserTaskModel; falls back to keywords without history"""
+    available = True
+    metered = False
+
+    def parse(self, text, user=None):
+        return self.parse_many([text], user)[0]
+
+    def parse_many(self, texts, user=None):
+        model = UserTaskModel.for_user(user) if user is not None else None
+        now = timezone.now()
+        results = []
+        for text in texts:
+            # Keyword hits (an explicit "urgent" or "2 hours") beat learned guesses
+            parsed, matched = keyword_parse(text)
+            due_date = extract_due_date(text, now)
+            parsed['due_date'] = due_date.isoformat() if due_date else None
+            if model:
+                tokens = tokenize(text)
+                if 'priority' not in matched:
+                    parsed['priority'] = model.priority.predict(tokens)
+                if model.category and 'category_suggestion' not in matched:
+                    parsed['category_suggestion'] = model.category.predict(tokens)
+                if model.duration and 'estimated_duration' not in matched:
+                    parsed['estimated_duration'] = model.duration.predict(tokens)
+            results.append(parsed)
+        return results
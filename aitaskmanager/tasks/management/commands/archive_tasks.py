@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from tasks.archive import archivable_tasks, archive_tasks
+
+
+class Command(BaseCommand):
+    help = 'Move finished tasks that have not changed recently into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive tasks untouched for this many days (default: TASK_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many tasks would be archived')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options['days']) if options['days'] is not None else None
+
+        if options['dry_run']:
+            count = archivable_tasks(older_than).count()
+            self.stdout.write(f'{count} task(s) would be archived')
+            return
+
+        count = archive_tasks(older_than, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {count} task(s)'))
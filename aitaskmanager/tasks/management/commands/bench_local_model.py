@@ -0,0 +1,38 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.local_model import LocalModelProvider, UserTaskModel
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = "Measure training time and batched parse throughput of the local model on a user's tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--count', type=int, default=5000, help='Number of texts to parse')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        start = time.perf_counter()
+        if not UserTaskModel.for_user(user):
+            raise CommandError(f"'{user.username}' has too few tasks to train a model")
+        self.stdout.write(f'Trained (or loaded) model in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        titles = list(Task.objects.filter(user=user).values_list('title', flat=True)[:options['count']])
+        texts = (titles * (options['count'] // len(titles) + 1))[:options['count']]
+
+        provider = LocalModelProvider()
+        batch_size = options['batch_size']
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            provider.parse_many(texts[i:i + batch_size], user=user)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'Parsed {len(texts)} texts in {elapsed:.2f}s ({len(texts) / elapsed:.0f} parses/s)')
@@ -0,0 +1,51 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import cache
+from tasks.views import dashboard_context, task_list_context, category_list_context
+
+
+class Command(BaseCommand):
+    help = 'Benchmark building the dashboard, task list and category list context with a cold and a warm fragment cache'
+
+    PAGES = [
+        ('dashboard', lambda user: dashboard_context(user)),
+        ('task_list', lambda user: task_list_context(user, {})),
+        ('category_list', lambda user: category_list_context(user)),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User whose pages are built')
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        iterations = options['iterations']
+
+        for name, build in self.PAGES:
+            cold = []
+            warm = []
+            for _ in range(iterations):
+                # Invalidate only this user's fragments; the cache also holds
+                # other users' data, rate-limit counters and trained models
+                cache.bump(user.id, cache.TASKS, cache.CATEGORIES, cache.INSIGHTS)
+                cold.append(self._time(build, user))
+                warm.append(self._time(build, user))
+
+            cold_ms = sum(cold) / iterations * 1000
+            warm_ms = sum(warm) / iterations * 1000
+            self.stdout.write(
+                f'{name:<15} cold {cold_ms:8.2f} ms   warm {warm_ms:8.2f} ms   '
+                f'speedup {cold_ms / warm_ms if warm_ms else 0:5.1f}x'
+            )
+
+    def _time(self, build, user):
+        start = time.perf_counter()
+        build(user)
+        return time.perf_counter() - start
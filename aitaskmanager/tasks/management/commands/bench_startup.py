@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a worker imports before serving its first request
+WORKER_BOOT = """
+import resource, django
+django.setup()
+import aitaskmanager.urls, tasks.views, tasks.forms, tasks.api.views
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us)} from -X importtime output
+
+    Nested imports keep their leading indentation in the module name.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name[1:].rstrip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Measure worker import time (-X importtime) and RSS, failing when over budget'
+
+    def add_arguments(self, parser):
+        budget = getattr(settings, 'STARTUP_BUDGET', {})
+        parser.add_argument('--max-ms', type=float, default=budget.get('MAX_MS'),
+                            help='Fail if imports take longer than this (default: STARTUP_BUDGET["MAX_MS"])')
+        parser.add_argument('--max-rss-mb', type=float, default=budget.get('MAX_RSS_MB'),
+                            help='Fail if peak RSS exceeds this (default: STARTUP_BUDGET["MAX_RSS_MB"])')
+        parser.add_argument('--forbid', nargs='*', default=['openai'],
+                            help='Top-level packages that must not be imported at startup')
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest modules to list')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'aitaskmanager.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WORKER_BOOT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        modules = parse_importtime(result.stderr)
+        top_level = [name for name in modules if not name.startswith(' ')]
+        total_ms = sum(modules[name][1] for name in top_level) / 1000
+        rss_mb = int(result.stdout.strip().splitlines()[-1]) / 1024
+
+        self.stdout.write(f'Imported {len(modules)} modules in {total_ms:.1f} ms, peak RSS {rss_mb:.1f} MB')
+        slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:options['top']]
+        for name, (self_us, cumulative_us) in slowest:
+            self.stdout.write(f'  {self_us / 1000:8.2f} ms self {cumulative_us / 1000:8.2f} ms cumulative  {name.strip()}')
+
+        failures = []
+        loaded = {name.strip().split('.')[0] for name in modules}
+        for package in options['forbid']:
+            if package in loaded:
+                failures.append(f"'{package}' is imported at startup")
+        if options['max_ms'] is not None and total_ms > options['max_ms']:
+            failures.append(f'import time {total_ms:.1f} ms exceeds {options["max_ms"]} ms')
+        if options['max_rss_mb'] is not None and rss_mb > options['max_rss_mb']:
+            failures.append(f'peak RSS {rss_mb:.1f} MB exceeds {options["max_rss_mb"]} MB')
+        if failures:
+            raise CommandError('; '.join(failures))
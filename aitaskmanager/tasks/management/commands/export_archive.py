@@ -0,0 +1,28 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.archive import export_csv, search_archive
+
+
+class Command(BaseCommand):
+    help = "Export a user's archived tasks as CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--query', default='', help='Only export archived tasks matching this text')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        archived = search_archive(user, options['query'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as out:
+                export_csv(archived, out)
+        else:
+            export_csv(archived, sys.stdout)
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import queue
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tasks import recompute
+
+
+class Command(BaseCommand):
+    help = 'Recompute ProductivityInsight rows and Task ai_* fields for every user across a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--since', type=date.fromisoformat, default=None,
+                            help='First insight day to recompute (default: 30 days ago)')
+        parser.add_argument('--only', choices=['insights', 'ai-fields'], default=None)
+        parser.add_argument('--skip-recommendations', action='store_true',
+                            help='Keep existing insight recommendations instead of regenerating them')
+        parser.add_argument('--checkpoint-dir', default='.recompute',
+                            help='Directory holding per-shard checkpoints')
+        parser.add_argument('--resume', action='store_true', help='Skip users finished by a previous run')
+        parser.add_argument('--dry-run', action='store_true', help='Compute everything but write nothing')
+
+    def handle(self, *args, **options):
+        shards = options['processes']
+        if shards < 1:
+            raise CommandError('--processes must be at least 1')
+        os.makedirs(options['checkpoint_dir'], exist_ok=True)
+
+        job = {
+            'since': options['since'] or date.today() - timedelta(days=30),
+            'chunk_size': options['chunk_size'],
+            'insights': options['only'] in (None, 'insights'),
+            'ai_fields': options['only'] in (None, 'ai-fields'),
+            'recommendations': not options['skip_recommendations'],
+            'checkpoint_dir': options['checkpoint_dir'],
+            'resume': options['resume'],
+            'dry_run': options['dry_run'],
+        }
+
+        total_users = User.objects.count()
+        # Children must open their own connections
+        connections.close_all()
+
+        progress = multiprocessing.Queue()
+        started = time.monotonic()
+        done = 0
+        with multiprocessing.Pool(shards, initializer=recompute.init_worker, initargs=(progress,)) as pool:
+            result = pool.starmap_async(recompute.run_shard, [(shard, shards, job) for shard in range(shards)])
+            last_report = started
+            while not result.ready() or not progress.empty():
+                try:
+                    done += progress.get(timeout=0.5)
+                except queue.Empty:
+                    pass
+                now = time.monotonic()
+                if now - last_report >= 5:
+                    last_report = now
+                    self._report(done, total_users, now - started)
+            shard_totals = result.get()
+
+        totals = {key: sum(t[key] for t in shard_totals) for key in shard_totals[0]}
+        elapsed = time.monotonic() - started
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Recomputed {totals['insights']} insight(s) and {totals['tasks']} task(s) "
+            f"for {totals['users']} user(s) in {elapsed:.1f}s ({totals['users'] / elapsed if elapsed else 0:.1f} users/s)"
+        ))
+
+    def _report(self, done, total, elapsed):
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(f'{done}/{total} users, {rate:.1f} users/s')
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.reminders import ReminderScheduler, get_setting, get_sink
+
+
+class Command(BaseCommand):
+    help = 'Run the due-date reminder scheduler'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process due reminders once and exit')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds between checks for edited tasks')
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval'] or get_setting('POLL_INTERVAL')
+        scheduler = ReminderScheduler(get_sink(), sync_overlap=poll_interval)
+
+        while True:
+            sent = scheduler.tick()
+            if sent:
+                self.stdout.write(f'Sent {sent} reminder(s), {len(scheduler)} scheduled')
+            if options['once']:
+                break
+
+            wait = scheduler.seconds_until_next(timezone.now())
+            time.sleep(poll_interval if wait is None else min(wait, poll_interval))
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('color', models.CharField(default='#007bff', max_length=7)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='categories', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Categories',
+                'unique_together': {('name', 'user')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('priority', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('URGENT', 'Urgent')], default='MEDIUM', max_length=10)),
+                ('status', models.CharField(choices=[('TODO', 'To Do'), ('IN_PROGRESS', 'In Progress'), ('DONE', 'Done'), ('ARCHIVED', 'Archived')], default='TODO', max_length=20)),
+                ('due_date', models.DateTimeField(blank=True, null=True)),
+                ('estimated_duration', models.IntegerField(blank=True, help_text='Estimated duration in minutes', null=True)),
+                ('actual_duration', models.IntegerField(blank=True, help_text='Actual duration in minutes', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('ai_priority_score', models.FloatField(blank=True, null=True)),
+                ('ai_category_suggestion', models.CharField(blank=True, max_length=100)),
+                ('ai_estimated_duration', models.IntegerField(blank=True, null=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tasks.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-priority', 'due_date', 'created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='labels', to='tasks.task')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductivityInsight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('tasks_completed', models.IntegerField(default=0)),
+                ('total_focus_time', models.IntegerField(default=0)),
+                ('average_task_duration', models.FloatField(default=0)),
+                ('peak_productivity_hour', models.IntegerField(blank=True, null=True)),
+                ('recommendations', models.TextField(blank=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='insights', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
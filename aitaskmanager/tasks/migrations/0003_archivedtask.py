@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_reminders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('category_name', models.CharField(blank=True, max_length=100)),
+                ('labels', models.JSONField(blank=True, default=list)),
+                ('priority', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('URGENT', 'Urgent')], max_length=10)),
+                ('status', models.CharField(choices=[('TODO', 'To Do'), ('IN_PROGRESS', 'In Progress'), ('DONE', 'Done'), ('ARCHIVED', 'Archived')], max_length=20)),
+                ('due_date', models.DateTimeField(blank=True, null=True)),
+                ('estimated_duration', models.IntegerField(blank=True, null=True)),
+                ('actual_duration', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('ai_priority_score', models.FloatField(blank=True, null=True)),
+                ('ai_category_suggestion', models.CharField(blank=True, max_length=100)),
+                ('ai_estimated_duration', models.IntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-updated_at'],
+                'indexes': [models.Index(fields=['user', '-updated_at'], name='archived_user_updated_idx')],
+            },
+        ),
+    ]
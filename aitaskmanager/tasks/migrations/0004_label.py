@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_archivedtask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Label',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='labels', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('name', 'user')},
+            },
+        ),
+        migrations.AddField(
+            model_name='tasklabel',
+            name='label',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_labels', to='tasks.label'),
+        ),
+    ]
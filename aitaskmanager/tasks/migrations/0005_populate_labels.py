@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def populate_labels(apps, schema_editor):
+    """Point every TaskLabel at a per-user Label, dropping duplicates per task"""
+    Label = apps.get_model('tasks', 'Label')
+    TaskLabel = apps.get_model('tasks', 'TaskLabel')
+
+    label_ids = {}
+    seen = set()
+    duplicates = []
+    for task_label in TaskLabel.objects.select_related('task').order_by('id').iterator(chunk_size=2000):
+        user_id = task_label.task.user_id
+        name = task_label.name.strip()
+        key = (user_id, name)
+        if key not in label_ids:
+            label_ids[key] = Label.objects.get_or_create(user_id=user_id, name=name)[0].id
+        label_id = label_ids[key]
+
+        if (task_label.task_id, label_id) in seen:
+            duplicates.append(task_label.id)
+            continue
+        seen.add((task_label.task_id, label_id))
+        TaskLabel.objects.filter(id=task_label.id).update(label_id=label_id)
+
+    TaskLabel.objects.filter(id__in=duplicates).delete()
+
+
+def restore_names(apps, schema_editor):
+    TaskLabel = apps.get_model('tasks', 'TaskLabel')
+    for task_label in TaskLabel.objects.select_related('label').iterator(chunk_size=2000):
+        TaskLabel.objects.filter(id=task_label.id).update(name=task_label.label.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_label'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_labels, restore_names),
+    ]
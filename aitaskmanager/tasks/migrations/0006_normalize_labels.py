@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_populate_labels'),
+    ]
+
+    operations = [
+        # Give the old column a default so the migration can be reversed
+        migrations.AlterField(
+            model_name='tasklabel',
+            name='name',
+            field=models.CharField(default='', max_length=50),
+        ),
+        migrations.RemoveField(
+            model_name='tasklabel',
+            name='name',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='labels',
+            field=models.ManyToManyField(blank=True, related_name='tasks', through='tasks.TaskLabel', to='tasks.label'),
+        ),
+        migrations.AlterField(
+            model_name='tasklabel',
+            name='label',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_labels', to='tasks.label'),
+        ),
+        migrations.AlterField(
+            model_name='tasklabel',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_labels', to='tasks.task'),
+        ),
+        migrations.AddConstraint(
+            model_name='tasklabel',
+            constraint=models.UniqueConstraint(fields=('label', 'task'), name='unique_task_label'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_normalize_labels'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AICounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -47,8 +47,17 @@ class Task(models.Model):
     ai_category_suggestion = models.CharField(max_length=100, blank=True)
     ai_estimated_duration = models.IntegerField(null=True, blank=True)
     
+    labels = models.ManyToManyField('Label', through='TaskLabel', related_name='tasks', blank=True)
+    
+    # Set by the reminder scheduler when the due-date reminder has been sent
+    reminded_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
     class Meta:
         ordering = ['-priority', 'due_date', 'created_at']
+        indexes = [
+            models.Index(fields=['due_date'], name='task_due_date_idx'),
+            models.Index(fields=['updated_at'], name='task_updated_at_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -66,13 +75,29 @@ class Task(models.Model):
             return timezone.now() > self.due_date
         return False
 
-class TaskLabel(models.Model):
+class Label(models.Model):
     name = models.CharField(max_length=50)
-    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='labels')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='labels')
+    
+    class Meta:
+        ordering = ['name']
+        unique_together = ['name', 'user']
     
     def __str__(self):
         return self.name
 
+class TaskLabel(models.Model):
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='task_labels')
+    label = models.ForeignKey(Label, on_delete=models.CASCADE, related_name='task_labels')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['label', 'task'], name='unique_task_label'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} - {self.label}"
+
 class ProductivityInsight(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='insights')
     date = models.DateField()
@@ -86,4 +111,43 @@ class ProductivityInsight(models.Model):
         unique_together = ['user', 'date']
     
     def __str__(self):
-        return f"{self.user.username} - {self.date}"
\ No newline at end of file
+        return f"{self.user.username} - {self.date}"
+
+class ArchivedTask(models.Model):
+    """Finished task moved out of the Task table by the archival pipeline"""
+    original_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_tasks')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    category_name = models.CharField(max_length=100, blank=True)
+    labels = models.JSONField(default=list, blank=True)
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES)
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    due_date = models.DateTimeField(null=True, blank=True)
+    estimated_duration = models.IntegerField(null=True, blank=True)
+    actual_duration = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+    ai_priority_score = models.FloatField(null=True, blank=True)
+    ai_category_suggestion = models.CharField(max_length=100, blank=True)
+    ai_estimated_duration = models.IntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='archived_user_updated_idx'),
+        ]
+    
+    def __str__(self):
+        return self.title
+
+class AICounter(models.Model):
+    """Shared total behind the per-process AI rate-limit and token counters"""
+    key = models.CharField(max_length=200, unique=True)
+    count = models.BigIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.key}: {self.count}"
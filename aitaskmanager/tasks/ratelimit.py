@@ -0,0 +1,213 @@
+"""Per-user rate limits and daily token quota for AI calls.
+
+Each process counts calls and tokens in memory. A daemon thread flushes the
+deltas to AICounter rows every AI_COUNTER_FLUSH_INTERVAL seconds in one
+transaction (an INSERT of missing rows, one ``count = count + delta`` UPDATE
+for all keys, and a SELECT of the shared totals), and prunes expired rows
+every PRUNE_INTERVAL seconds. Limiting a request never touches the database;
+with an interval of 0 the flush runs inline instead (tests, single process).
+
+Guarantee: the totals in the database are exact. A process sees the usage
+of other processes at most one flush interval late, so a limit can be
+exceeded by no more than what the other workers admit within one interval.
+
+Rates use a sliding window approximated from the current and previous fixed
+windows.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import BigIntegerField, Case, DateTimeField, F, Value, When
+from django.utils import timezone
+
+from .models import AICounter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_LIMIT = (20, 60)  # calls per seconds
+PRUNE_INTERVAL = 5 * 60  # seconds between deletes of expired AICounter rows
+BATCH_SIZE = 500
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+class CounterStore:
+    """Process-local counters backed by shared AICounter totals"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(int)  # deltas not yet sent
+        self._in_flight = {}              # deltas being sent by the current flush
+        self._shared = {}                 # totals read back at the last flush
+        self._expires = {}                # watched key -> expiry timestamp
+        self._last_prune = 0.0
+        self._flusher_pid = None          # process running the background flush
+
+    def watch(self, key, ttl):
+        """Track a key so the next flush reads its shared total"""
+        expires = time.time() + ttl
+        with self._lock:
+            if self._expires.get(key, 0) < expires:
+                self._expires[key] = expires
+
+    def value(self, key):
+        with self._lock:
+            return self._shared.get(key, 0) + self._in_flight.get(key, 0) + self._pending.get(key, 0)
+
+    def add(self, key, delta, ttl):
+        """Add ``delta`` to ``key`` and return its estimated total"""
+        self.watch(key, ttl)
+        with self._lock:
+            self._pending[key] += delta
+        self.maybe_flush()
+        return self.value(key)
+
+    def interval(self):
+        return getattr(settings, 'AI_COUNTER_FLUSH_INTERVAL', 1.0)
+
+    def maybe_flush(self):
+        """Flush now when the interval is 0, else make sure the flusher thread runs"""
+        if self.interval() <= 0:
+            self.flush()
+            return
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            # Checked per pid: a forked worker doesn't inherit the thread
+            self._flusher_pid = pid
+        threading.Thread(target=self._run, name='ai-counter-flush', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(max(self.interval(), 0.1))
+            try:
+                self.flush()
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._flush()
+        finally:
+            self._flush_lock.release()
+
+    def _flush(self):
+        now = time.time()
+        with self._lock:
+            for key in [key for key, expires in self._expires.items() if expires <= now]:
+                del self._expires[key]
+                self._shared.pop(key, None)
+            self._in_flight, self._pending = dict(self._pending), defaultdict(int)
+            expires = dict(self._expires)
+
+        deltas = {key: delta for key, delta in self._in_flight.items() if delta}
+        keys = list(expires)
+        totals = {}
+        try:
+            with transaction.atomic():
+                items = list(deltas.items())
+                for i in range(0, len(items), BATCH_SIZE):
+                    batch = dict(items[i:i + BATCH_SIZE])
+                    self._add_shared(batch, {key: _to_datetime(expires.get(key, now)) for key in batch})
+                for i in range(0, len(keys), BATCH_SIZE):
+                    totals.update(
+                        AICounter.objects.filter(key__in=keys[i:i + BATCH_SIZE], expires_at__gt=_to_datetime(now))
+                        .values_list('key', 'count')
+                    )
+            if now - self._last_prune >= PRUNE_INTERVAL:
+                self._last_prune = now
+                AICounter.objects.filter(expires_at__lte=_to_datetime(now)).delete()
+        except DatabaseError:
+            logger.exception('Could not flush AI usage counters')
+            with self._lock:
+                for key, delta in self._in_flight.items():
+                    self._pending[key] += delta
+                self._in_flight = {}
+            return
+
+        with self._lock:
+            self._shared = {key: totals.get(key, 0) for key in keys}
+            self._in_flight = {}
+
+    def _add_shared(self, deltas, expires_at):
+        """Add ``deltas`` (key -> delta) to the shared rows in two statements"""
+        # Rows another process creates first are skipped, then updated below
+        AICounter.objects.bulk_create(
+            [AICounter(key=key, count=0, expires_at=expires_at[key]) for key in deltas],
+            ignore_conflicts=True,
+        )
+        AICounter.objects.filter(key__in=deltas).update(
+            count=F('count') + Case(
+                *[When(key=key, then=Value(delta)) for key, delta in deltas.items()],
+                default=Value(0), output_field=BigIntegerField(),
+            ),
+            expires_at=Case(
+                *[When(key=key, then=Value(expires)) for key, expires in expires_at.items()],
+                default=F('expires_at'), output_field=DateTimeField(),
+            ),
+        )
+
+
+counters = CounterStore()
+
+
+def get_rate_limit(endpoint):
+    limits = getattr(settings, 'AI_RATE_LIMITS', {})
+    return limits.get(endpoint, limits.get('default', DEFAULT_RATE_LIMIT))
+
+
+def hit(user_id, endpoint, now=None):
+    """Count a call against the user's rate for ``endpoint``; False if over the limit"""
+    limit, window = get_rate_limit(endpoint)
+    now = time.time() if now is None else now
+    current = int(now // window)
+    prefix = f'ratelimit:{endpoint}:{user_id}'
+
+    counters.watch(f'{prefix}:{current - 1}', window)
+    count = counters.add(f'{prefix}:{current}', 1, window * 2)
+    previous = counters.value(f'{prefix}:{current - 1}')
+    weight = 1 - (now % window) / window
+    return previous * weight + count <= limit
+
+
+def _quota_key(user_id):
+    return f'tokens:{user_id}:{timezone.now().date().isoformat()}'
+
+
+def tokens_spent_today(user_id):
+    key = _quota_key(user_id)
+    counters.watch(key, 2 * 24 * 60 * 60)
+    counters.maybe_flush()
+    return counters.value(key)
+
+
+def spend_tokens(user_id, tokens):
+    """Reserve estimated tokens from today's quota; False (and nothing spent) if it would be exceeded"""
+    quota = getattr(settings, 'AI_DAILY_TOKEN_QUOTA', None)
+    key = _quota_key(user_id)
+    total = counters.add(key, tokens, 2 * 24 * 60 * 60)
+    if quota is not None and total > quota:
+        counters.add(key, -tokens, 2 * 24 * 60 * 60)
+        return False
+    return True
+
+
+def allow(user_id, endpoint, tokens):
+    """True if the user may make an AI call to ``endpoint`` costing about ``tokens``"""
+    return hit(user_id, endpoint) and spend_tokens(user_id, tokens)
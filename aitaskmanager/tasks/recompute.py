@@ -0,0 +1,124 @@
+"""Bulk recomputation of ProductivityInsight rows and Task ai_* fields.
+
+Users are sharded across worker processes by ``id % shards``. Each worker
+streams its users in id order, writes with bulk_update/bulk_create, records
+the last finished user id in a per-shard checkpoint file and reports
+progress through a queue.
+"""
+import json
+import os
+
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import F
+
+from . import cache
+from .ai_service import ai_service, priority_score
+from .insights import build_insights
+from .models import Task, ProductivityInsight
+
+AI_FIELDS = ['ai_priority_score', 'ai_category_suggestion', 'ai_estimated_duration']
+
+_progress = None
+
+
+def init_worker(progress):
+    global _progress
+    import django
+    django.setup()
+    # Never share a connection inherited from the parent process
+    connections.close_all()
+    _progress = progress
+
+
+def checkpoint_path(directory, shard, shards):
+    return os.path.join(directory, f'shard-{shard}-of-{shards}.json')
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)['last_user_id']
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, user_id):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'last_user_id': user_id}, f)
+    os.replace(tmp, path)
+
+
+def recompute_insights(user, since, dry_run, with_recommendations):
+    insights = build_insights(user, since, with_recommendations=with_recommendations)
+    if dry_run or not insights:
+        return len(insights)
+
+    fields = ['tasks_completed', 'total_focus_time', 'average_task_duration']
+    if with_recommendations:
+        fields.append('recommendations')
+    with transaction.atomic():
+        ProductivityInsight.objects.bulk_update([i for i in insights if i.pk], fields)
+        ProductivityInsight.objects.bulk_create([i for i in insights if not i.pk])
+    cache.bump(user.id, cache.INSIGHTS)
+    return len(insights)
+
+
+def recompute_ai_fields(user, chunk_size, dry_run):
+    tasks = (
+        Task.objects.filter(user=user, ai_priority_score__isnull=False)
+        .only('id', 'title', 'description', *AI_FIELDS)
+        .order_by('id')
+    )
+    count = 0
+    batch = []
+    for task in tasks.iterator(chunk_size=chunk_size):
+        batch.append(task)
+        if len(batch) >= chunk_size:
+            count += _flush_ai_fields(user, batch, dry_run)
+            batch = []
+    count += _flush_ai_fields(user, batch, dry_run)
+    if count and not dry_run:
+        # bulk_update does not send post_save
+        cache.bump(user.id, cache.TASKS)
+    return count
+
+
+def _flush_ai_fields(user, batch, dry_run):
+    if not batch:
+        return 0
+    parsed_batch = ai_service.parse_batch([task.description or task.title for task in batch], user=user)
+    for task, parsed in zip(batch, parsed_batch):
+        task.ai_priority_score = priority_score(parsed.get('priority'))
+        task.ai_category_suggestion = parsed.get('category_suggestion') or ''
+        task.ai_estimated_duration = parsed.get('estimated_duration')
+    if not dry_run:
+        Task.objects.bulk_update(batch, AI_FIELDS)
+    return len(batch)
+
+
+def run_shard(shard, shards, options):
+    """Recompute every user in one shard; returns totals for the shard"""
+    path = checkpoint_path(options['checkpoint_dir'], shard, shards)
+    start_after = read_checkpoint(path) if options['resume'] else 0
+
+    users = (
+        User.objects.annotate(shard=F('id') % shards)
+        .filter(shard=shard, id__gt=start_after)
+        .order_by('id')
+    )
+    totals = {'users': 0, 'insights': 0, 'tasks': 0}
+    for user in users.iterator(chunk_size=options['chunk_size']):
+        if options['insights']:
+            totals['insights'] += recompute_insights(
+                user, options['since'], options['dry_run'], options['recommendations']
+            )
+        if options['ai_fields']:
+            totals['tasks'] += recompute_ai_fields(user, options['chunk_size'], options['dry_run'])
+        totals['users'] += 1
+        if not options['dry_run']:
+            write_checkpoint(path, user.id)
+        if _progress is not None:
+            _progress.put(1)
+    return totals
@@ -0,0 +1,186 @@
+"""Due-date reminders.
+
+The scheduler keeps only the reminders that fire within a sliding horizon in
+an in-memory heap. As time advances it extends that window with range scans
+on the ``due_date`` index, and picks up edits with range scans on the
+``updated_at`` index, so the task table is never scanned in full.
+"""
+import heapq
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = ['TODO', 'IN_PROGRESS']
+
+DEFAULTS = {
+    'SINK': 'tasks.reminders.LogSink',
+    'PATH': 'reminders.jsonl', # JSONLinesSink output file
+    'LEAD_TIME': 15 * 60,     # seconds before the due date
+    'HORIZON': 60 * 60,       # seconds of upcoming reminders kept in memory
+    'CATCH_UP': 24 * 60 * 60, # seconds of missed reminders sent on startup
+    'POLL_INTERVAL': 5,       # seconds between change polls
+    'BATCH_SIZE': 2000,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'TASK_REMINDERS', {}).get(name, DEFAULTS[name])
+
+
+class LogSink:
+    """Write reminders to the application log"""
+
+    def notify(self, tasks):
+        for task in tasks:
+            logger.info("Reminder: '%s' for %s is due %s", task.title, task.user.username, task.due_date)
+
+
+class JSONLinesSink:
+    """Append reminders as JSON lines to a local file"""
+
+    def __init__(self, path=None):
+        self.path = path or get_setting('PATH')
+
+    def notify(self, tasks):
+        with open(self.path, 'a') as f:
+            for task in tasks:
+                f.write(json.dumps({
+                    'task_id': task.id,
+                    'user_id': task.user_id,
+                    'title': task.title,
+                    'due_date': task.due_date.isoformat(),
+                }) + '\n')
+
+
+def get_sink():
+    return import_string(get_setting('SINK'))()
+
+
+class ReminderScheduler:
+    def __init__(self, sink, lead_time=None, horizon=None, catch_up=None, batch_size=None, sync_overlap=None):
+        self.sink = sink
+        self.lead_time = timedelta(seconds=lead_time if lead_time is not None else get_setting('LEAD_TIME'))
+        self.horizon = timedelta(seconds=horizon if horizon is not None else get_setting('HORIZON'))
+        self.catch_up = timedelta(seconds=catch_up if catch_up is not None else get_setting('CATCH_UP'))
+        self.batch_size = batch_size or get_setting('BATCH_SIZE')
+        # Rows can commit after a poll with an updated_at from before it, so each
+        # sync rescans one poll interval back; schedule() ignores duplicates.
+        self.sync_overlap = timedelta(
+            seconds=sync_overlap if sync_overlap is not None else get_setting('POLL_INTERVAL')
+        )
+
+        self.heap = []       # (fire timestamp, task id)
+        self.scheduled = {}  # task id -> fire timestamp of its live heap entry
+        self.loaded_from = None
+        self.loaded_until = None
+        self.last_sync = None
+
+    def __len__(self):
+        return len(self.scheduled)
+
+    def _is_pending(self, due_date, reminded_at):
+        # A reminder sent before the current fire time belongs to an older due date
+        return reminded_at is None or reminded_at < due_date - self.lead_time
+
+    def _in_window(self, due_date):
+        return self.loaded_from <= due_date < self.loaded_until
+
+    def schedule(self, task_id, due_date):
+        fire_at = (due_date - self.lead_time).timestamp()
+        if self.scheduled.get(task_id) == fire_at:
+            return
+        self.scheduled[task_id] = fire_at
+        heapq.heappush(self.heap, (fire_at, task_id))
+
+    def unschedule(self, task_id):
+        # The heap entry is dropped lazily when it reaches the top
+        self.scheduled.pop(task_id, None)
+
+    def load_window(self, now):
+        """Extend the in-memory window to cover due dates up to now + lead time + horizon"""
+        until = now + self.lead_time + self.horizon
+        if self.loaded_until is None:
+            self.loaded_from = self.loaded_until = now - self.catch_up
+        if until <= self.loaded_until:
+            return
+
+        rows = Task.objects.filter(
+            status__in=PENDING_STATUSES,
+            due_date__gte=self.loaded_until,
+            due_date__lt=until,
+        ).order_by().values_list('id', 'due_date', 'reminded_at')
+        self.loaded_until = until
+
+        for task_id, due_date, reminded_at in rows.iterator(chunk_size=self.batch_size):
+            if self._is_pending(due_date, reminded_at):
+                self.schedule(task_id, due_date)
+
+    def sync_changes(self, now):
+        """Reschedule tasks edited since the previous sync"""
+        since, self.last_sync = self.last_sync, now
+        if since is None:
+            return
+
+        rows = Task.objects.filter(
+            updated_at__gte=since - self.sync_overlap,
+        ).order_by().values_list('id', 'status', 'due_date', 'reminded_at')
+
+        for task_id, status, due_date, reminded_at in rows.iterator(chunk_size=self.batch_size):
+            if (status in PENDING_STATUSES and due_date and self._in_window(due_date)
+                    and self._is_pending(due_date, reminded_at)):
+                self.schedule(task_id, due_date)
+            else:
+                self.unschedule(task_id)
+
+    def pop_due(self, now):
+        """Remove and return the ids of reminders whose fire time has passed"""
+        cutoff = now.timestamp()
+        due = []
+        while self.heap and self.heap[0][0] <= cutoff:
+            fire_at, task_id = heapq.heappop(self.heap)
+            if self.scheduled.get(task_id) == fire_at:
+                del self.scheduled[task_id]
+                due.append(task_id)
+        return due
+
+    def fire_due(self, now):
+        """Send every reminder that is due and mark it as sent"""
+        task_ids = self.pop_due(now)
+        sent = 0
+        for i in range(0, len(task_ids), self.batch_size):
+            batch = Task.objects.filter(
+                id__in=task_ids[i:i + self.batch_size],
+                status__in=PENDING_STATUSES,
+                due_date__isnull=False,
+            ).select_related('user')
+            # Re-check against the database in case an edit has not been synced yet
+            tasks = [
+                task for task in batch
+                if task.due_date - self.lead_time <= now and self._is_pending(task.due_date, task.reminded_at)
+            ]
+            if not tasks:
+                continue
+            self.sink.notify(tasks)
+            # update() leaves updated_at alone, so sent reminders are not re-synced
+            Task.objects.filter(id__in=[task.id for task in tasks]).update(reminded_at=now)
+            sent += len(tasks)
+        return sent
+
+    def seconds_until_next(self, now):
+        if not self.heap:
+            return None
+        return max(0.0, self.heap[0][0] - now.timestamp())
+
+    def tick(self, now=None):
+        now = now or timezone.now()
+        self.sync_changes(now)
+        self.load_window(now)
+        return self.fire_due(now)
@@ -0,0 +1,66 @@
+from rest_framework import serializers
+
+from .labels import set_task_labels
+from .models import Category, Task, ProductivityInsight
+
+
+class LabelNamesField(serializers.ListField):
+    """Label names in, label names out, for the Task.labels many-to-many"""
+    
+    def to_representation(self, value):
+        return [label.name for label in value.all()]
+
+
+class TaskSerializer(serializers.ModelSerializer):
+    labels = LabelNamesField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+    )
+    is_overdue = serializers.BooleanField(read_only=True)
+    
+    class Meta:
+        model = Task
+        fields = [
+            'id', 'title', 'description', 'category', 'priority', 'status', 'due_date',
+            'estimated_duration', 'actual_duration', 'created_at', 'updated_at', 'completed_at',
+            'ai_priority_score', 'ai_category_suggestion', 'ai_estimated_duration', 'labels', 'is_overdue',
+        ]
+        read_only_fields = [
+            'created_at', 'updated_at', 'completed_at',
+            'ai_priority_score', 'ai_category_suggestion', 'ai_estimated_duration',
+        ]
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the requesting user's own categories can be attached to a task
+        user = getattr(self.context.get('request'), 'user', None)
+        if user is not None and user.is_authenticated:
+            self.fields['category'].queryset = Category.objects.filter(user=user)
+        else:
+            self.fields['category'].queryset = Category.objects.none()
+    
+    def validate_labels(self, value):
+        return list(dict.fromkeys(name.strip() for name in value if name.strip()))
+    
+    def create(self, validated_data):
+        label_names = validated_data.pop('labels', None)
+        task = super().create(validated_data)
+        if label_names is not None:
+            set_task_labels(task, label_names)
+        return task
+    
+    def update(self, instance, validated_data):
+        label_names = validated_data.pop('labels', None)
+        task = super().update(instance, validated_data)
+        if label_names is not None:
+            set_task_labels(task, label_names)
+        return task
+
+
+class InsightSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductivityInsight
+        fields = [
+            'id', 'date', 'tasks_completed', 'total_focus_time', 'average_task_duration',
+            'peak_productivity_hour', 'recommendations',
+        ]
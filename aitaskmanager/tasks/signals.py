@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import cache, snapshot
+from .models import Task, Category, Label, ProductivityInsight
+
+
+def bump_on_commit(user_id, *scopes):
+    """Bump once the write is committed, so no other worker can rebuild a
+    fragment from pre-commit data under the new version"""
+    def bump():
+        cache.bump(user_id, *scopes)
+        if cache.TASKS in scopes:
+            snapshot.store.discard(user_id)
+    transaction.on_commit(bump)
+
+
+@receiver([post_save, post_delete], sender=Task)
+def invalidate_task_fragments(sender, instance, **kwargs):
+    bump_on_commit(instance.user_id, cache.TASKS)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_fragments(sender, instance, **kwargs):
+    # Task rows render their category, and deleting one nulls it on tasks
+    bump_on_commit(instance.user_id, cache.CATEGORIES, cache.TASKS)
+
+
+@receiver([post_save, post_delete], sender=ProductivityInsight)
+def invalidate_insight_fragments(sender, instance, **kwargs):
+    bump_on_commit(instance.user_id, cache.INSIGHTS)
+
+
+@receiver([post_save, post_delete], sender=Label)
+def invalidate_label_fragments(sender, instance, **kwargs):
+    bump_on_commit(instance.user_id, cache.TASKS)
+
+
+@receiver(m2m_changed, sender=Task.labels.through)
+def invalidate_tagging_fragments(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        bump_on_commit(instance.user_id, cache.TASKS)
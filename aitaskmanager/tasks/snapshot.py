@@ -0,0 +1,206 @@
+"""Compact in-process snapshots of each active user's tasks.
+
+A snapshot stores a user's tasks column by column in typed arrays (ids,
+status codes, priority ranks, due timestamps, category ids) plus interned
+titles, in the model's default ordering. Dashboard counts, the overdue check
+and status/priority/category filters are answered from it without building
+model instances; the task list fetches just the matching rows when a
+snapshot is already resident. Snapshots are stamped with the user's task
+cache version, so the same save/delete signals that invalidate fragments
+invalidate them, and the store evicts least recently used snapshots beyond a
+memory budget.
+
+Snapshots are held per process. Version checks only see writes made by other
+processes when the task cache is shared (see tasks.cache), so every snapshot
+is also rebuilt once it is older than TASK_SNAPSHOTS['MAX_AGE'] seconds.
+
+Enabled with TASK_SNAPSHOTS['ENABLED'].
+"""
+import math
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import cache
+from .models import Task
+
+STATUS_CODES = {status: code for code, (status, _) in enumerate(Task.STATUS_CHOICES)}
+PRIORITY_RANKS = {priority: rank for rank, (priority, _) in enumerate(Task.PRIORITY_CHOICES)}
+STATUSES = list(STATUS_CODES)
+PRIORITIES = list(PRIORITY_RANKS)
+OPEN_CODES = {STATUS_CODES['TODO'], STATUS_CODES['IN_PROGRESS']}
+DONE_CODE = STATUS_CODES['DONE']
+NO_DUE_DATE = math.inf
+FETCH_CHUNK = 500  # ids per pk__in query, under SQLite's parameter limit
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+class TaskSnapshot:
+    __slots__ = ['version', 'built_at', 'ids', 'status', 'priority', 'due', 'category', 'titles', 'nbytes']
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.ids = array('q')
+        self.status = array('b')
+        self.priority = array('b')
+        self.due = array('d')
+        self.category = array('q')
+        self.titles = []
+        for task_id, title, status, priority, due_date, category_id in rows:
+            self.ids.append(task_id)
+            self.status.append(STATUS_CODES[status])
+            self.priority.append(PRIORITY_RANKS[priority])
+            self.due.append(due_date.timestamp() if due_date else NO_DUE_DATE)
+            self.category.append(category_id or 0)
+            self.titles.append(sys.intern(title))
+
+        self.nbytes = sum(
+            column.itemsize * len(column)
+            for column in (self.ids, self.status, self.priority, self.due, self.category)
+        ) + sys.getsizeof(self.titles) + sum(sys.getsizeof(title) for title in self.titles)
+
+    @classmethod
+    def build(cls, user_id, version):
+        rows = Task.objects.filter(user_id=user_id).values_list(
+            'id', 'title', 'status', 'priority', 'due_date', 'category_id'
+        )
+        return cls(version, rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def filter(self, status=None, priority=None, category_id=None):
+        """Row indexes matching the given field values, in task ordering
+
+        ``category_id`` is an int; callers validate request parameters.
+        """
+        rows = range(len(self.ids))
+        if status:
+            code = STATUS_CODES.get(status)
+            rows = [i for i in rows if self.status[i] == code]
+        if priority:
+            rank = PRIORITY_RANKS.get(priority)
+            rows = [i for i in rows if self.priority[i] == rank]
+        if category_id:
+            rows = [i for i in rows if self.category[i] == category_id]
+        return list(rows)
+
+    def task_ids(self, rows):
+        return [self.ids[i] for i in rows]
+
+    def is_overdue(self, i, now=None):
+        """Same rule as Task.is_overdue"""
+        now = (now or timezone.now()).timestamp()
+        return self.status[i] != DONE_CODE and self.due[i] < now
+
+    def stats(self, now=None):
+        """Dashboard counts, plus the next due date of an open task"""
+        now = (now or timezone.now()).timestamp()
+        completed = pending = overdue = 0
+        next_due = NO_DUE_DATE
+        for code, due in zip(self.status, self.due):
+            if code == DONE_CODE:
+                completed += 1
+            elif code in OPEN_CODES:
+                pending += 1
+                if due < now:
+                    overdue += 1
+                elif due < next_due:
+                    next_due = due
+        return {
+            'total_tasks': len(self.ids),
+            'completed_tasks': completed,
+            'pending_tasks': pending,
+            'overdue_tasks': overdue,
+            'next_due': None if next_due == NO_DUE_DATE else _to_datetime(next_due),
+        }
+
+    def row(self, i, now=None):
+        due = self.due[i]
+        return {
+            'id': self.ids[i],
+            'title': self.titles[i],
+            'status': STATUSES[self.status[i]],
+            'priority': PRIORITIES[self.priority[i]],
+            'due_date': None if due == NO_DUE_DATE else _to_datetime(due),
+            'category': self.category[i] or None,
+            'is_overdue': self.is_overdue(i, now),
+        }
+
+
+class SnapshotStore:
+    """Per-process LRU of snapshots bounded by their total size in bytes and their age"""
+
+    def __init__(self, max_bytes, max_age=None):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.nbytes = 0
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, build=True):
+        """The user's current snapshot; None when it isn't resident and ``build`` is false"""
+        version = cache.get_versions(user_id, [cache.TASKS])[0]
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is not None and snapshot.version == version and not self._expired(snapshot):
+                self._snapshots.move_to_end(user_id)
+                return snapshot
+        if not build:
+            return None
+
+        snapshot = TaskSnapshot.build(user_id, version)
+        with self._lock:
+            self._discard(user_id)
+            if snapshot.nbytes <= self.max_bytes:
+                self._snapshots[user_id] = snapshot
+                self.nbytes += snapshot.nbytes
+                while self.nbytes > self.max_bytes:
+                    _, evicted = self._snapshots.popitem(last=False)
+                    self.nbytes -= evicted.nbytes
+        return snapshot
+
+    def _expired(self, snapshot):
+        return self.max_age is not None and time.monotonic() - snapshot.built_at >= self.max_age
+
+    def discard(self, user_id):
+        with self._lock:
+            self._discard(user_id)
+
+    def _discard(self, user_id):
+        snapshot = self._snapshots.pop(user_id, None)
+        if snapshot is not None:
+            self.nbytes -= snapshot.nbytes
+
+
+def _setting(name, default):
+    return getattr(settings, 'TASK_SNAPSHOTS', {}).get(name, default)
+
+
+store = SnapshotStore(_setting('MAX_BYTES', 64 * 1024 * 1024), _setting('MAX_AGE', 60))
+
+
+def get_snapshot(user, build=True):
+    """The user's snapshot, or None when snapshots are disabled (or not resident and ``build`` is false)"""
+    if not _setting('ENABLED', False):
+        return None
+    return store.get(user.id, build)
+
+
+def fetch_tasks(queryset, task_ids):
+    """Tasks from ``queryset`` with the given ids, in that order, FETCH_CHUNK ids per query"""
+    tasks = {}
+    for i in range(0, len(task_ids), FETCH_CHUNK):
+        tasks.update((task.pk, task) for task in queryset.filter(pk__in=task_ids[i:i + FETCH_CHUNK]))
+    # Tasks deleted since the snapshot was built are skipped
+    return [tasks[task_id] for task_id in task_ids if task_id in tasks]
@@ -1,3 +1,892 @@
-from django.test import TestCase
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import ai_service, cache, checks, ratelimit, snapshot, views
+from .archive import archivable_tasks, archive_batch, archive_tasks, export_csv, search_archive
+from .digest import build_stats, estimate_tokens, format_digest
+from .insights import build_insights
+from .labels import filter_by_labels, label_counts, parse_label_names, set_task_labels
+from .local_model import LocalModelProvider, UserTaskModel, extract_due_date
+from .models import AICounter, ArchivedTask, Category, Label, ProductivityInsight, Task
+from .recompute import recompute_insights
+from .reminders import JSONLinesSink, ReminderScheduler
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tasks-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create(username='alice')
+        self.builds = 0
+
+    def fragment(self, scopes):
+        def build():
+            self.builds += 1
+            return self.builds
+        return cache.cached_fragment(self.user.id, 'test', scopes, build)
+
+    def assertRebuilt(self, scopes, change):
+        built = self.fragment(scopes)
+        self.assertEqual(self.fragment(scopes), built)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertEqual(self.fragment(scopes), built + 1)
+
+    def test_bump_waits_for_commit(self):
+        built = self.fragment([cache.TASKS])
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(user=self.user, title='a')
+            self.assertEqual(self.fragment([cache.TASKS]), built)
+        self.assertEqual(self.fragment([cache.TASKS]), built + 1)
+
+    def test_task_save_and_delete(self):
+        task = Task.objects.create(user=self.user, title='a')
+        task.title = 'b'
+        self.assertRebuilt([cache.TASKS], task.save)
+        self.assertRebuilt([cache.TASKS], task.delete)
+
+    def test_category_change_invalidates_tasks(self):
+        category = Category.objects.create(user=self.user, name='Work')
+        self.assertRebuilt([cache.TASKS], category.save)
+
+    def test_insight_save(self):
+        insight = ProductivityInsight(user=self.user, date=timezone.now().date())
+        self.assertRebuilt([cache.INSIGHTS], insight.save)
+
+    def test_other_users_are_untouched(self):
+        self.fragment([cache.TASKS])
+        Task.objects.create(user=User.objects.create(username='bob'), title='a')
+        self.fragment([cache.TASKS])
+        self.assertEqual(self.builds, 1)
+
+    def test_bump_writes_a_fresh_version(self):
+        before = cache.get_versions(self.user.id, [cache.TASKS, cache.INSIGHTS])
+        with mock.patch.object(cache.get_cache(), 'incr', side_effect=AssertionError('incr is not atomic')):
+            cache.bump(self.user.id, cache.TASKS)
+            bumped = cache.get_versions(self.user.id, [cache.TASKS, cache.INSIGHTS])
+            cache.bump(self.user.id, cache.TASKS)
+        self.assertNotEqual(bumped[0], before[0])
+        self.assertEqual(bumped[1], before[1])
+        self.assertNotIn(cache.get_versions(self.user.id, [cache.TASKS])[0], [before[0], bumped[0]])
+
+    def test_parts_distinguish_fragments(self):
+        first = cache.cached_fragment(self.user.id, 'test', [cache.TASKS], lambda: 'a', 'TODO')
+        second = cache.cached_fragment(self.user.id, 'test', [cache.TASKS], lambda: 'b', 'DONE')
+        self.assertEqual((first, second), ('a', 'b'))
+
+    def test_callable_timeout_can_skip_caching(self):
+        def build():
+            self.builds += 1
+            return self.builds
+        for _ in range(2):
+            cache.cached_fragment(self.user.id, 'test', [cache.TASKS], build, timeout=lambda value: 0)
+        self.assertEqual(self.builds, 2)
+
+
+class RecordingSink:
+    def __init__(self):
+        self.sent = []
+
+    def notify(self, tasks):
+        self.sent.extend(task.title for task in tasks)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+        self.sink = RecordingSink()
+        self.now = timezone.now()
+
+    def task(self, title, due_in, **fields):
+        return Task.objects.create(user=self.user, title=title, due_date=self.now + due_in, **fields)
+
+    def scheduler(self, **options):
+        options.setdefault('lead_time', 15 * 60)
+        options.setdefault('horizon', 60 * 60)
+        options.setdefault('catch_up', 24 * 60 * 60)
+        return ReminderScheduler(self.sink, **options)
+
+    def test_fires_within_lead_time_once(self):
+        self.task('soon', timedelta(minutes=10))
+        self.task('later', timedelta(minutes=40))
+        self.task('far', timedelta(days=3))
+        scheduler = self.scheduler()
+
+        self.assertEqual(scheduler.tick(self.now), 1)
+        self.assertEqual(self.sink.sent, ['soon'])
+        self.assertEqual(scheduler.tick(self.now + timedelta(minutes=26)), 1)
+        self.assertEqual(scheduler.tick(self.now + timedelta(minutes=27)), 0)
+        self.assertEqual(self.sink.sent, ['soon', 'later'])
+        self.assertIsNotNone(Task.objects.get(title='soon').reminded_at)
+
+    def test_reschedules_edited_due_date(self):
+        task = self.task('moved', timedelta(minutes=40))
+        scheduler = self.scheduler()
+        scheduler.tick(self.now)
+
+        task.due_date = self.now + timedelta(minutes=50)
+        task.save()
+        self.assertEqual(scheduler.tick(self.now + timedelta(minutes=27)), 0)
+        self.assertEqual(scheduler.tick(self.now + timedelta(minutes=36)), 1)
+        self.assertEqual(self.sink.sent, ['moved'])
+
+    def test_sync_overlaps_the_previous_poll(self):
+        scheduler = self.scheduler(sync_overlap=5)
+        scheduler.tick(self.now)
+        # Committed after that poll, but stamped just before it
+        task = self.task('late commit', timedelta(minutes=20))
+        Task.objects.filter(pk=task.pk).update(updated_at=self.now - timedelta(seconds=2))
+
+        self.assertEqual(scheduler.tick(self.now + timedelta(minutes=6)), 1)
+        self.assertEqual(self.sink.sent, ['late commit'])
+
+    def test_unschedules_finished_task(self):
+        task = self.task('done', timedelta(minutes=40))
+        scheduler = self.scheduler()
+        scheduler.tick(self.now)
+
+        task.status = 'DONE'
+        task.save()
+        self.assertEqual(scheduler.tick(self.now + timedelta(minutes=30)), 0)
+        self.assertEqual(len(scheduler), 0)
+
+    def test_catch_up_sends_recent_missed_reminders(self):
+        self.task('missed', -timedelta(hours=1))
+        self.task('too old', -timedelta(days=3))
+        self.task('already sent', -timedelta(hours=2), reminded_at=self.now - timedelta(hours=2, minutes=10))
+
+        self.assertEqual(self.scheduler().tick(self.now), 1)
+        self.assertEqual(self.sink.sent, ['missed'])
+
+
+    def test_json_lines_sink_defaults_path(self):
+        task = self.task('due', timedelta(minutes=5))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'reminders.jsonl')
+            with override_settings(TASK_REMINDERS={'SINK': 'tasks.reminders.JSONLinesSink'}):
+                sink = JSONLinesSink()
+            self.assertEqual(sink.path, 'reminders.jsonl')
+            JSONLinesSink(path).notify([task])
+            with open(path) as f:
+                self.assertEqual(json.loads(f.readline())['task_id'], task.id)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+        self.category = Category.objects.create(user=self.user, name='Work')
+
+    def test_moves_only_finished_tasks(self):
+        done = Task.objects.create(
+            user=self.user, title='done', status='DONE', category=self.category, actual_duration=20,
+        )
+        set_task_labels(done, ['report'])
+        todo = Task.objects.create(user=self.user, title='todo')
+
+        self.assertEqual(archive_batch([done.id, todo.id], older_than=timedelta(0)), 1)
+        self.assertFalse(Task.objects.filter(id=done.id).exists())
+        self.assertTrue(Task.objects.filter(id=todo.id).exists())
+
+        archived = ArchivedTask.objects.get()
+        self.assertEqual(archived.original_id, done.id)
+        self.assertEqual(archived.category_name, 'Work')
+        self.assertEqual(archived.labels, ['report'])
+        self.assertEqual(archived.actual_duration, 20)
+        self.assertEqual(archived.updated_at, done.updated_at)
+
+    def test_nothing_to_archive(self):
+        self.assertEqual(archive_batch([]), 0)
+        self.assertFalse(ArchivedTask.objects.exists())
+
+    def test_skips_tasks_edited_since_selection(self):
+        task = Task.objects.create(user=self.user, title='done', status='DONE')
+        Task.objects.update(updated_at=timezone.now() - timedelta(days=40))
+        task_ids = list(archivable_tasks(timedelta(days=30)).values_list('id', flat=True))
+        task.title = 'edited'
+        task.save()
+
+        self.assertEqual(archive_batch(task_ids, timedelta(days=30)), 0)
+        self.assertTrue(Task.objects.filter(id=task.id).exists())
+
+    def test_archive_tasks_only_moves_old_finished_tasks(self):
+        for i in range(5):
+            Task.objects.create(user=self.user, title=f'old {i}', status='DONE')
+        Task.objects.create(user=self.user, title='old open')
+        Task.objects.update(updated_at=timezone.now() - timedelta(days=40))
+        Task.objects.create(user=self.user, title='recent', status='DONE')
+
+        self.assertEqual(archive_tasks(timedelta(days=30), batch_size=2), 5)
+        self.assertEqual(
+            sorted(Task.objects.values_list('title', flat=True)), ['old open', 'recent'],
+        )
+
+    def test_search_and_export(self):
+        task = Task.objects.create(user=self.user, title='Quarterly report', status='DONE', category=self.category)
+        set_task_labels(task, ['finance'])
+        Task.objects.create(user=self.user, title='Groceries', status='DONE')
+        archive_batch(Task.objects.values_list('id', flat=True), older_than=timedelta(0))
+
+        self.assertEqual([a.title for a in search_archive(self.user, 'quarterly')], ['Quarterly report'])
+        self.assertEqual([a.title for a in search_archive(self.user, 'work')], ['Quarterly report'])
+        self.assertEqual([a.title for a in search_archive(self.user, 'FINANCE')], ['Quarterly report'])
+        self.assertEqual(search_archive(User.objects.create(username='bob')).count(), 0)
+
+        out = io.StringIO()
+        export_csv(search_archive(self.user, 'report'), out)
+        header, row = out.getvalue().splitlines()
+        self.assertTrue(header.startswith('original_id,title'))
+        self.assertIn('finance', row)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DigestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+        now = timezone.now()
+        for i in range(40):
+            Task.objects.create(
+                user=self.user,
+                title=f'task {i}',
+                status=['TODO', 'DONE', 'IN_PROGRESS'][i % 3],
+                priority=['LOW', 'HIGH', 'URGENT'][i % 3],
+                category=Category.objects.create(user=self.user, name=f'Category {i}'),
+                due_date=now + timedelta(days=i % 20 - 10),
+                estimated_duration=30,
+                actual_duration=30 + i if i % 2 else None,
+            )
+        self.stats = build_stats(Task.objects.filter(user=self.user))
+
+    def test_stats(self):
+        self.assertEqual(self.stats['total'], 40)
+        self.assertEqual(len(self.stats['categories']), 40)
+        self.assertEqual(self.stats['estimates']['timed'], 20)
+
+    def test_full_digest_lists_categories(self):
+        text = format_digest(self.stats, max_tokens=10000)
+        self.assertIn('Categories (open/done): ', text)
+        self.assertIn('Category 39', text)
+
+    def test_trims_categories_to_budget(self):
+        text = format_digest(self.stats, max_tokens=120)
+        self.assertLessEqual(estimate_tokens(text), 120)
+        self.assertIn('Category 0', text)
+        self.assertNotIn('Category 39', text)
+
+    def test_drops_lines_to_budget(self):
+        text = format_digest(self.stats, max_tokens=30)
+        self.assertLessEqual(estimate_tokens(text), 30)
+        self.assertNotIn('Categories', text)
+        self.assertTrue(text.startswith('Tasks: 40 total'))
+
+
+class LabelMigrationTests(TransactionTestCase):
+    before = [('tasks', '0004_label')]
+    after = [('tasks', '0006_normalize_labels')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_forwards_and_backwards(self):
+        apps = self.migrate(self.before)
+        UserModel = apps.get_model('auth', 'User')
+        OldTask = apps.get_model('tasks', 'Task')
+        OldTaskLabel = apps.get_model('tasks', 'TaskLabel')
+        alice = UserModel.objects.create(username='alice')
+        bob = UserModel.objects.create(username='bob')
+        first = OldTask.objects.create(user=alice, title='first')
+        second = OldTask.objects.create(user=alice, title='second')
+        third = OldTask.objects.create(user=bob, title='third')
+        for task, name in [(first, 'work'), (first, 'work'), (first, 'home'), (second, 'work '), (third, 'work')]:
+            OldTaskLabel.objects.create(task=task, name=name)
+
+        apps = self.migrate(self.after)
+        NewLabel = apps.get_model('tasks', 'Label')
+        NewTask = apps.get_model('tasks', 'Task')
+        self.assertEqual(
+            sorted(NewLabel.objects.values_list('user__username', 'name')),
+            [('alice', 'home'), ('alice', 'work'), ('bob', 'work')],
+        )
+        labels_of = {
+            task.title: sorted(label.name for label in task.labels.all())
+            for task in NewTask.objects.all()
+        }
+        self.assertEqual(labels_of, {'first': ['home', 'work'], 'second': ['work'], 'third': ['work']})
+
+        apps = self.migrate(self.before)
+        OldTaskLabel = apps.get_model('tasks', 'TaskLabel')
+        self.assertEqual(
+            sorted(OldTaskLabel.objects.values_list('task__title', 'name')),
+            [('first', 'home'), ('first', 'work'), ('second', 'work'), ('third', 'work')],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LabelTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create(username='alice')
+        self.both = Task.objects.create(user=self.user, title='both')
+        self.work = Task.objects.create(user=self.user, title='work only')
+        self.none = Task.objects.create(user=self.user, title='unlabelled')
+        set_task_labels(self.both, ['work', 'urgent'])
+        set_task_labels(self.work, ['work'])
+
+    def titles(self, names, match):
+        tasks = filter_by_labels(Task.objects.filter(user=self.user), self.user, names, match)
+        return sorted(tasks.values_list('title', flat=True))
+
+    def test_parse_label_names(self):
+        self.assertEqual(parse_label_names(' work, home ,,work'), ['work', 'home'])
+
+    def test_any(self):
+        self.assertEqual(self.titles(['work', 'urgent'], 'any'), ['both', 'work only'])
+        self.assertEqual(self.titles(['urgent'], 'any'), ['both'])
+
+    def test_all(self):
+        self.assertEqual(self.titles(['work', 'urgent'], 'all'), ['both'])
+        self.assertEqual(self.titles(['work', 'missing'], 'all'), [])
+
+    def test_no_names_returns_everything(self):
+        self.assertEqual(len(self.titles([], 'all')), 3)
+
+    def test_labels_are_per_user(self):
+        other = User.objects.create(username='bob')
+        set_task_labels(Task.objects.create(user=other, title='theirs'), ['work'])
+        self.assertEqual(Label.objects.filter(name='work').count(), 2)
+        self.assertEqual(self.titles(['work'], 'any'), ['both', 'work only'])
+
+    def test_label_changes_invalidate_counts(self):
+        self.assertEqual(label_counts(self.user), [('urgent', 1), ('work', 2)])
+        with self.captureOnCommitCallbacks(execute=True):
+            set_task_labels(self.none, ['work'])
+        self.assertEqual(label_counts(self.user), [('urgent', 1), ('work', 3)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.both.labels.clear()
+        self.assertEqual(label_counts(self.user), [('urgent', 0), ('work', 2)])
+
+    def test_api_only_accepts_own_categories(self):
+        mine = Category.objects.create(user=self.user, name='Work')
+        theirs = Category.objects.create(user=User.objects.create(username='bob'), name='Work')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/tasks/', {'title': 'sneaky', 'category': theirs.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('category', response.json())
+        response = client.post('/api/tasks/', {'title': 'fine', 'category': mine.id, 'labels': ['work']}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['labels'], ['work'])
+        response = client.patch(f'/api/tasks/{self.work.id}/', {'category': theirs.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@contextmanager
+def importable_openai():
+    """Put a stand-in openai package on PYTHONPATH for worker subprocesses
+
+    Without it, an accidental eager import would go unnoticed wherever the
+    real package isn't installed.
+    """
+    with tempfile.TemporaryDirectory() as path:
+        with open(os.path.join(path, 'openai.py'), 'w') as stub:
+            stub.write('class OpenAI:\n    def __init__(self, **kwargs):\n        pass\n')
+        pythonpath = os.pathsep.join(filter(None, [path, os.environ.get('PYTHONPATH')]))
+        with mock.patch.dict(os.environ, {'PYTHONPATH': pythonpath}):
+            yield
+
+
+class EchoProvider:
+    available = True
+    metered = True
+
+    def parse(self, text, user=None):
+        return {'title': text}
+
+
+class ProviderRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(ai_service.PROVIDERS.pop, 'echo', None)
+        self.addCleanup(ai_service._provider_instances.pop, 'echo', None)
+
+    def test_default_provider_is_cached(self):
+        provider = ai_service.get_provider('openai')
+        self.assertIsInstance(provider, ai_service.OpenAIProvider)
+        self.assertIs(ai_service.get_provider('openai'), provider)
+
+    def test_register_provider(self):
+        ai_service.register_provider('echo', EchoProvider)
+        with override_settings(AI_PROVIDER='echo'):
+            self.assertIsInstance(ai_service.get_provider(), EchoProvider)
+            self.assertEqual(ai_service.AITaskService().parse_natural_language('hello'), {'title': 'hello'})
+
+    def test_register_provider_by_path(self):
+        ai_service.register_provider('echo', 'tasks.tests.EchoProvider')
+        self.assertIsInstance(ai_service.get_provider('echo'), EchoProvider)
+
+    @override_settings(OPENAI_API_KEY='')
+    def test_unavailable_provider_falls_back_to_keywords(self):
+        ai_service._provider_instances.pop('openai', None)
+        self.addCleanup(ai_service._provider_instances.pop, 'openai', None)
+        parsed = ai_service.AITaskService().parse_natural_language('urgent gym session 2 hours')
+        self.assertEqual(
+            (parsed['priority'], parsed['estimated_duration'], parsed['category_suggestion']),
+            ('URGENT', 120, 'Health'),
+        )
+
+    def test_unknown_provider(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ai_service.get_provider('nope')
+        with override_settings(AI_PROVIDER='nope'):
+            self.assertEqual([error.id for error in checks.check_ai_provider(None)], ['tasks.E001'])
+        self.assertEqual(checks.check_ai_provider(None), [])
+
+    def test_views_do_not_import_openai(self):
+        code = 'import sys, django; django.setup(); import tasks.views; print("openai" in sys.modules)'
+        with importable_openai():
+            result = subprocess.run(
+                [sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+                env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'aitaskmanager.settings'},
+            )
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_singleton_follows_provider_changes(self):
+        service = ai_service.AITaskService()
+        self.assertIsInstance(service.provider, ai_service.OpenAIProvider)
+        ai_service.register_provider('echo', EchoProvider)
+        with override_settings(AI_PROVIDER='echo'):
+            self.assertIsInstance(service.provider, EchoProvider)
+            self.assertEqual(service.parse_natural_language('hello'), {'title': 'hello'})
+        self.assertIsInstance(service.provider, ai_service.OpenAIProvider)
+
+
+class StartupBudgetTests(SimpleTestCase):
+    def test_worker_boots_within_budget(self):
+        out = io.StringIO()
+        with importable_openai():
+            call_command('bench_startup', top=0, stdout=out)
+        self.assertIn('peak RSS', out.getvalue())
+
+    def test_reports_forbidden_imports_and_budget(self):
+        with self.assertRaisesMessage(CommandError, "'csv' is imported at startup"):
+            call_command('bench_startup', forbid=['csv'], top=0, stdout=io.StringIO())
+        with self.assertRaisesMessage(CommandError, 'exceeds 0.001 MB'):
+            call_command('bench_startup', max_rss_mb=0.001, top=0, stdout=io.StringIO())
+
+
+@override_settings(AI_COUNTER_FLUSH_INTERVAL=0)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(ratelimit, 'counters', ratelimit.CounterStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(AI_RATE_LIMITS={'test': (3, 60)})
+    def test_hit_limits_calls_per_window(self):
+        self.assertEqual([ratelimit.hit(1, 'test', now=1200) for _ in range(4)], [True, True, True, False])
+        self.assertTrue(ratelimit.hit(2, 'test', now=1200))
+        # Late in the next window the previous one barely counts
+        self.assertTrue(ratelimit.hit(1, 'test', now=1319))
+        self.assertTrue(ratelimit.hit(1, 'test', now=1500))
+
+    @override_settings(AI_DAILY_TOKEN_QUOTA=100)
+    def test_spend_tokens_respects_quota(self):
+        self.assertTrue(ratelimit.spend_tokens(1, 60))
+        self.assertFalse(ratelimit.spend_tokens(1, 60))
+        self.assertEqual(ratelimit.tokens_spent_today(1), 60)
+        self.assertTrue(ratelimit.spend_tokens(1, 40))
+
+    @override_settings(AI_DAILY_TOKEN_QUOTA=100)
+    def test_counters_are_shared_between_processes(self):
+        ratelimit.spend_tokens(1, 70)
+        other = ratelimit.CounterStore()
+        key = ratelimit._quota_key(1)
+        other.watch(key, 60)
+        other.flush()
+        self.assertEqual(other.value(key), 70)
+
+    @override_settings(AI_COUNTER_FLUSH_INTERVAL=60, AI_RATE_LIMITS={'test': (3, 60)})
+    def test_requests_leave_the_flush_to_a_thread(self):
+        with mock.patch.object(ratelimit.threading, 'Thread') as thread, mock.patch.object(ratelimit.atexit, 'register'):
+            with self.assertNumQueries(0):
+                self.assertTrue(ratelimit.hit(1, 'test', now=1200))
+                self.assertTrue(ratelimit.spend_tokens(1, 10))
+        thread.assert_called_once_with(target=ratelimit.counters._run, name='ai-counter-flush', daemon=True)
+        ratelimit.counters.flush()
+        self.assertEqual(AICounter.objects.get(key=ratelimit._quota_key(1)).count, 10)
+
+    def test_flush_cost_does_not_grow_with_keys(self):
+        ratelimit.counters._last_prune = time.time()
+
+        def flush_queries(count):
+            for i in range(count):
+                ratelimit.counters._pending[f'key:{count}:{i}'] += 1
+                ratelimit.counters.watch(f'key:{count}:{i}', 60)
+            with CaptureQueriesContext(connection) as queries:
+                ratelimit.counters.flush()
+            return len(queries)
+
+        self.assertEqual(flush_queries(3), flush_queries(30))
+        self.assertEqual(AICounter.objects.filter(count=1).count(), 33)
+
+    def test_expired_rows_are_pruned_periodically(self):
+        expired = timezone.now() - timedelta(seconds=1)
+        AICounter.objects.create(key='old', count=1, expires_at=expired)
+        ratelimit.counters.flush()
+        self.assertFalse(AICounter.objects.filter(key='old').exists())
+        AICounter.objects.create(key='old', count=1, expires_at=expired)
+        ratelimit.counters.flush()
+        self.assertTrue(AICounter.objects.filter(key='old').exists())
+
+    @override_settings(AI_PROVIDER='echo', AI_RATE_LIMITS={'test': (1, 60)})
+    def test_parsing_falls_back_over_the_limit(self):
+        ai_service.register_provider('echo', EchoProvider)
+        self.addCleanup(ai_service.PROVIDERS.pop, 'echo', None)
+        self.addCleanup(ai_service._provider_instances.pop, 'echo', None)
+        user = User.objects.create(username='alice')
+        service = ai_service.AITaskService()
+        self.assertEqual(service.parse_natural_language('call bob', user=user, endpoint='test'), {'title': 'call bob'})
+        self.assertEqual(service.parse_natural_language('call bob', user=user, endpoint='test')['priority'], 'MEDIUM')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class InsightTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+        self.day = timezone.now() - timedelta(days=40)
+        self.since = self.day.date() - timedelta(days=1)
+        for title, duration in [('a', 20), ('b', 40)]:
+            Task.objects.create(user=self.user, title=title, status='DONE', actual_duration=duration)
+        Task.objects.create(user=self.user, title='open', estimated_duration=90)
+        Task.objects.update(updated_at=self.day)
+
+    def build(self):
+        return build_insights(self.user, self.since, with_recommendations=False)
+
+    def assertValues(self, insight, completed, focus, average):
+        self.assertEqual(
+            (insight.tasks_completed, insight.total_focus_time, insight.average_task_duration),
+            (completed, focus, average),
+        )
+
+    def test_daily_values(self):
+        [insight] = self.build()
+        self.assertEqual(insight.date, self.day.date())
+        self.assertIsNone(insight.pk)
+        self.assertValues(insight, 2, 60, 30)
+
+    def test_reuses_existing_rows(self):
+        ProductivityInsight.objects.bulk_create(self.build())
+        [insight] = self.build()
+        self.assertIsNotNone(insight.pk)
+
+    def test_archived_tasks_still_count(self):
+        ProductivityInsight.objects.bulk_create(self.build())
+        archive_batch(list(Task.objects.filter(title='b').values_list('id', flat=True)))
+        [insight] = self.build()
+        self.assertValues(insight, 2, 60, 30)
+
+    def test_days_without_activity_are_reset(self):
+        ProductivityInsight.objects.bulk_create(self.build())
+        Task.objects.all().delete()
+        [insight] = self.build()
+        self.assertValues(insight, 0, 0, 0)
+
+    def test_recompute_writes_rows(self):
+        self.assertEqual(recompute_insights(self.user, self.since, dry_run=True, with_recommendations=False), 1)
+        self.assertFalse(ProductivityInsight.objects.exists())
+        recompute_insights(self.user, self.since, dry_run=False, with_recommendations=False)
+        recompute_insights(self.user, self.since, dry_run=False, with_recommendations=False)
+        self.assertValues(ProductivityInsight.objects.get(), 2, 60, 30)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LocalModelTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create(username='alice')
+        work = Category.objects.create(user=self.user, name='Work')
+        garden = Category.objects.create(user=self.user, name='Garden')
+        for i in range(30):
+            if i % 2:
+                Task.objects.create(
+                    user=self.user, title=f'deploy server for client {i}', priority='HIGH',
+                    category=work, estimated_duration=90,
+                )
+            else:
+                Task.objects.create(
+                    user=self.user, title=f'mow lawn and plant tomatoes {i}', priority='LOW',
+                    category=garden, estimated_duration=20,
+                )
+        self.provider = LocalModelProvider()
+
+    def test_extract_due_date(self):
+        # A Wednesday
+        now = datetime(2026, 10, 14, 12, tzinfo=dt_timezone.utc)
+        self.assertEqual(extract_due_date('call mum today', now), date(2026, 10, 14))
+        self.assertEqual(extract_due_date('Tomorrow: dentist', now), date(2026, 10, 15))
+        self.assertEqual(extract_due_date('renew passport in 2 weeks', now), date(2026, 10, 28))
+        self.assertEqual(extract_due_date('file taxes 2026-11-02', now), date(2026, 11, 2))
+        self.assertEqual(extract_due_date('standup monday', now), date(2026, 10, 19))
+        self.assertEqual(extract_due_date('review on wednesday', now), date(2026, 10, 21))
+        self.assertIsNone(extract_due_date('someday maybe', now))
+
+    def test_learns_from_history(self):
+        parsed = self.provider.parse('plant tomatoes', user=self.user)
+        self.assertEqual(
+            (parsed['priority'], parsed['category_suggestion'], parsed['estimated_duration']),
+            ('LOW', 'Garden', 20),
+        )
+        parsed = self.provider.parse('deploy the client server', user=self.user)
+        self.assertEqual((parsed['priority'], parsed['category_suggestion']), ('HIGH', 'Work'))
+
+    def test_keywords_beat_the_model(self):
+        parsed = self.provider.parse('urgent: mow lawn for 2 hours', user=self.user)
+        self.assertEqual((parsed['priority'], parsed['estimated_duration']), ('URGENT', 120))
+
+    def test_falls_back_to_keywords_without_history(self):
+        newcomer = User.objects.create(username='bob')
+        self.assertIsNone(UserTaskModel.for_user(newcomer))
+        parsed = self.provider.parse('mow lawn tomorrow', user=newcomer)
+        self.assertEqual((parsed['priority'], parsed['category_suggestion']), ('MEDIUM', 'General'))
+        self.assertIsNotNone(parsed['due_date'])
+
+    def test_parse_many(self):
+        parsed = self.provider.parse_many(['mow lawn', 'deploy server'], user=self.user)
+        self.assertEqual([p['category_suggestion'] for p in parsed], ['Garden', 'Work'])
+
+    def test_keyword_parse_reports_matched_fields(self):
+        parsed, matched = ai_service.keyword_parse('medium priority report for 30 min')
+        self.assertEqual(matched, {'priority', 'estimated_duration', 'category_suggestion'})
+        parsed, matched = ai_service.keyword_parse('quick call')
+        self.assertEqual((parsed['estimated_duration'], matched), (15, {'estimated_duration'}))
+
+    def test_explicit_defaults_are_kept(self):
+        parsed = self.provider.parse('mow lawn tomorrow 30 min medium', user=self.user)
+        self.assertEqual(
+            (parsed['priority'], parsed['estimated_duration'], parsed['category_suggestion']),
+            ('MEDIUM', 30, 'Garden'),
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TASK_SNAPSHOTS={'ENABLED': True})
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+        self.category = Category.objects.create(user=self.user, name='Work')
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_tasks(now)
+        self.tasks = Task.objects.filter(user=self.user)
+
+    def create_tasks(self, now):
+        for i in range(12):
+            Task.objects.create(
+                user=self.user,
+                title=f'task {i}',
+                status=['TODO', 'DONE', 'IN_PROGRESS', 'ARCHIVED'][i % 4],
+                priority=['LOW', 'MEDIUM', 'HIGH', 'URGENT'][i % 3],
+                category=self.category if i % 2 else None,
+                due_date=now + timedelta(days=i - 6) if i % 5 else None,
+            )
+
+    def test_stats_match_orm(self):
+        stats = snapshot.get_snapshot(self.user).stats()
+        pending = self.tasks.filter(status__in=['TODO', 'IN_PROGRESS'])
+        self.assertEqual(stats['total_tasks'], self.tasks.count())
+        self.assertEqual(stats['completed_tasks'], self.tasks.filter(status='DONE').count())
+        self.assertEqual(stats['pending_tasks'], pending.count())
+        self.assertEqual(stats['overdue_tasks'], pending.filter(due_date__lt=timezone.now()).count())
+        next_due = pending.filter(due_date__gte=timezone.now()).order_by('due_date').first().due_date
+        self.assertAlmostEqual(stats['next_due'].timestamp(), next_due.timestamp(), places=3)
+
+    def test_filters_match_orm(self):
+        task_snapshot = snapshot.get_snapshot(self.user)
+        for status, priority, category in [('TODO', None, None), (None, 'HIGH', None), ('DONE', None, self.category.id)]:
+            expected = self.tasks
+            if status:
+                expected = expected.filter(status=status)
+            if priority:
+                expected = expected.filter(priority=priority)
+            if category:
+                expected = expected.filter(category_id=category)
+            rows = task_snapshot.filter(status, priority, category)
+            self.assertEqual([task_snapshot.ids[i] for i in rows], list(expected.values_list('id', flat=True)))
+
+    def test_overdue_matches_model(self):
+        task_snapshot = snapshot.get_snapshot(self.user)
+        tasks = {task.id: task for task in self.tasks}
+        for i in range(len(task_snapshot)):
+            self.assertEqual(task_snapshot.is_overdue(i), tasks[task_snapshot.ids[i]].is_overdue)
+
+    def test_rebuilt_after_task_change(self):
+        before = snapshot.get_snapshot(self.user)
+        task = self.tasks.filter(status='TODO').first()
+        task.status = 'DONE'
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+        after = snapshot.get_snapshot(self.user)
+        self.assertIsNot(before, after)
+        self.assertEqual(after.stats()['completed_tasks'], before.stats()['completed_tasks'] + 1)
+
+    def test_rebuilt_after_max_age(self):
+        store = snapshot.SnapshotStore(max_bytes=1024 * 1024, max_age=60)
+        first = store.get(self.user.id)
+        self.assertIs(store.get(self.user.id), first)
+        first.built_at -= 61
+        self.assertIsNot(store.get(self.user.id), first)
+
+    def test_store_evicts_beyond_budget(self):
+        first = snapshot.TaskSnapshot.build(self.user.id, 0)
+        store = snapshot.SnapshotStore(max_bytes=first.nbytes)
+        other = User.objects.create(username='bob')
+        Task.objects.create(user=other, title='theirs')
+        store.get(self.user.id)
+        store.get(other.id)
+        self.assertEqual(list(store._snapshots), [other.id])
+        self.assertLessEqual(store.nbytes, store.max_bytes)
+
+    def test_compact_api_matches_full_listing(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        compact = client.get('/api/tasks/', {'compact': 1, 'status': 'TODO'}).json()
+        full = client.get('/api/tasks/', {'status': 'TODO'}).json()
+        self.assertEqual([row['id'] for row in compact], [row['id'] for row in full])
+        self.assertEqual([row['is_overdue'] for row in compact], [row['is_overdue'] for row in full])
+
+    def test_api_rejects_a_non_numeric_category(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for params in [{'category': 'abc'}, {'category': 'abc', 'compact': 1}]:
+            response = client.get('/api/tasks/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('category', response.json())
+        compact = client.get('/api/tasks/', {'compact': 1, 'category': str(self.category.id)}).json()
+        self.assertEqual(len(compact), 6)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PageContextTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create(username='alice')
+        self.work = Category.objects.create(user=self.user, name='Work')
+        now = timezone.now()
+        self.overdue = Task.objects.create(user=self.user, title='overdue', due_date=now - timedelta(days=1))
+        self.report = Task.objects.create(
+            user=self.user, title='report', priority='HIGH', category=self.work, due_date=now + timedelta(days=1),
+        )
+        self.done = Task.objects.create(user=self.user, title='done', status='DONE', category=self.work)
+        set_task_labels(self.report, ['q3', 'finance'])
+        set_task_labels(self.done, ['q3'])
+        Task.objects.create(user=User.objects.create(username='bob'), title='not mine')
+
+    def titles(self, params):
+        return sorted(task.title for task in views.task_list_context(self.user, params)['tasks'])
+
+    def test_dashboard_counts(self):
+        context = views.dashboard_context(self.user)
+        self.assertEqual(
+            (context['total_tasks'], context['completed_tasks'], context['pending_tasks'], context['overdue_tasks']),
+            (3, 1, 2, 1),
+        )
+        self.assertEqual(len(context['recent_tasks']), 3)
+        self.assertTrue(context['recommendations'])
+
+    @override_settings(TASK_SNAPSHOTS={'ENABLED': True})
+    def test_dashboard_counts_from_snapshot(self):
+        context = views.dashboard_context(self.user)
+        self.assertEqual(
+            (context['total_tasks'], context['completed_tasks'], context['pending_tasks'], context['overdue_tasks']),
+            (3, 1, 2, 1),
+        )
+
+    def test_dashboard_follows_changes(self):
+        views.dashboard_context(self.user)
+        self.overdue.status = 'DONE'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.overdue.save()
+        context = views.dashboard_context(self.user)
+        self.assertEqual((context['completed_tasks'], context['overdue_tasks']), (2, 0))
+
+    def test_task_list_filters(self):
+        self.assertEqual(self.titles({}), ['done', 'overdue', 'report'])
+        self.assertEqual(self.titles({'status': 'DONE'}), ['done'])
+        self.assertEqual(self.titles({'priority': 'HIGH'}), ['report'])
+        self.assertEqual(self.titles({'category': str(self.work.id)}), ['done', 'report'])
+        self.assertEqual(self.titles({'labels': 'q3,finance'}), ['done', 'report'])
+        self.assertEqual(self.titles({'labels': 'q3,finance', 'match': 'all'}), ['report'])
+        # A mangled category parameter is ignored rather than a server error
+        self.assertEqual(self.titles({'category': 'abc'}), ['done', 'overdue', 'report'])
+
+    @override_settings(TASK_SNAPSHOTS={'ENABLED': True})
+    def test_task_list_from_resident_snapshot(self):
+        snapshot.store.discard(self.user.id)
+        self.titles({'status': 'TODO'})
+        self.assertNotIn(self.user.id, snapshot.store._snapshots)  # never built for the list
+
+        cache.get_cache().clear()
+        snapshot.get_snapshot(self.user)
+        with mock.patch.object(snapshot, 'FETCH_CHUNK', 1), mock.patch.object(views.labels, 'filter_by_labels') as orm:
+            self.assertEqual(self.titles({}), ['done', 'overdue', 'report'])
+            self.assertEqual(self.titles({'status': 'TODO', 'category': str(self.work.id)}), ['report'])
+            self.assertEqual(self.titles({'priority': 'LOW'}), [])
+        orm.assert_not_called()
+        with self.assertNumQueries(2):  # one chunk of tasks, one of their labels
+            tasks = views.task_list_context(self.user, {'status': 'DONE'})['tasks']
+        self.assertEqual([task.title for task in tasks], ['done'])
+        self.assertEqual([label.name for label in tasks[0].labels.all()], ['q3'])
+
+    def test_task_list_follows_changes(self):
+        self.assertEqual(self.titles({'status': 'TODO'}), ['overdue', 'report'])
+        self.report.status = 'DONE'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.report.save()
+        self.assertEqual(self.titles({'status': 'TODO'}), ['overdue'])
+
+    def test_category_list(self):
+        context = views.category_list_context(self.user)
+        self.assertEqual([category.name for category in context['categories']], ['Work'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(user=self.user, name='Home')
+        self.assertEqual(len(views.category_list_context(self.user)['categories']), 2)
+
+    def test_views_pass_the_request_user(self):
+        factory = RequestFactory()
+        with mock.patch.object(views, 'render', side_effect=lambda request, template, context: context):
+            for view, params in [(views.dashboard, {}), (views.task_list, {'status': 'DONE'}), (views.category_list, {})]:
+                request = factory.get('/', params)
+                request.user = self.user
+                self.assertTrue(view(request))
@@ -10,5 +10,8 @@ urlpatterns = [
     path('categories/', views.category_list, name='category_list'),
     path('categories/create/', views.category_create, name='category_create'),
     
+    path('archive/', views.archive_list, name='archive_list'),
+    path('archive/export/', views.archive_export, name='archive_export'),
+    
     path('quick-add/', views.quick_add, name='quick_add'),
 ]
\ No newline at end of file
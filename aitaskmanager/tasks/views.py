@@ -1,8 +1,9 @@
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Avg, Sum
+from django.db.models import Count, Sum, Min, Q
 from django.utils import timezone
 from datetime import timedelta
 import json
@@ -10,78 +11,153 @@ import json
 from .models import Task, Category, ProductivityInsight
 from .forms import TaskForm, CategoryForm
 from .ai_service import ai_service
+from .insights import generate_daily_insight
+from . import archive, cache, digest, labels, snapshot
 
 @login_required
 def dashboard(request):
     """Main dashboard view"""
+    return render(request, 'tasks/dashboard.html', dashboard_context(request.user))
+
+def dashboard_context(user):
+    """Dashboard template context, assembled from per-user cached fragments"""
+    user_id = user.id
+    
     # Get user's tasks
-    tasks = Task.objects.filter(user=request.user).order_by('-created_at')
+    tasks = Task.objects.filter(user=user).order_by('-created_at')
     
-    # Statistics
-    total_tasks = tasks.count()
-    completed_tasks = tasks.filter(status='DONE').count()
-    pending_tasks = tasks.filter(status__in=['TODO', 'IN_PROGRESS']).count()
-    overdue_tasks = tasks.filter(status__in=['TODO', 'IN_PROGRESS']).filter(due_date__lt=timezone.now()).count()
+    # Statistics, counted from the in-memory snapshot when enabled, otherwise
+    # cached until a task changes or the next pending task becomes overdue
+    task_snapshot = snapshot.get_snapshot(user)
+    if task_snapshot is not None:
+        stats = task_snapshot.stats()
+    else:
+        stats = cache.cached_fragment(
+            user_id, 'dashboard_stats', [cache.TASKS],
+            lambda: _dashboard_stats(tasks),
+            timeout=_stats_timeout,
+        )
     
     # Recent tasks
-    recent_tasks = tasks[:5]
+    recent_tasks = cache.cached_fragment(
+        user_id, 'dashboard_recent', [cache.TASKS, cache.CATEGORIES],
+        lambda: list(tasks.select_related('category')[:5]),
+    )
     
     # AI recommendations
-    recommendations = ai_service.get_productivity_recommendations(tasks)
+    recommendations = cache.cached_fragment(
+        user_id, 'dashboard_recommendations', [cache.TASKS, cache.CATEGORIES],
+        lambda: ai_service.get_productivity_recommendations(tasks, stats=digest.user_stats(user)),
+    )
+    
+    # Chart data for the last 7 days of productivity insights
+    chart_data = cache.cached_fragment(
+        user_id, 'dashboard_chart', [cache.INSIGHTS],
+        lambda: _dashboard_chart_data(user),
+        timezone.now().date(),
+    )
     
-    # Productivity insights for last 7 days
+    return {
+        'total_tasks': stats['total_tasks'],
+        'completed_tasks': stats['completed_tasks'],
+        'pending_tasks': stats['pending_tasks'],
+        'overdue_tasks': stats['overdue_tasks'],
+        'recent_tasks': recent_tasks,
+        'recommendations': recommendations,
+        'chart_data': chart_data,
+    }
+
+def _dashboard_stats(tasks):
+    now = timezone.now()
+    pending = Q(status__in=['TODO', 'IN_PROGRESS'])
+    stats = tasks.aggregate(
+        total_tasks=Count('id'),
+        completed_tasks=Count('id', filter=Q(status='DONE')),
+        pending_tasks=Count('id', filter=pending),
+        overdue_tasks=Count('id', filter=pending & Q(due_date__lt=now)),
+        next_due=Min('due_date', filter=pending & Q(due_date__gte=now)),
+    )
+    return stats
+
+def _stats_timeout(stats):
+    """Expire the stats no later than the moment the next task becomes overdue"""
+    if stats['next_due'] is None:
+        return cache.DEFAULT_TIMEOUT
+    seconds = (stats['next_due'] - timezone.now()).total_seconds()
+    return max(0, min(cache.DEFAULT_TIMEOUT, int(seconds)))
+
+def _dashboard_chart_data(user):
     seven_days_ago = timezone.now() - timedelta(days=7)
     insights = ProductivityInsight.objects.filter(
-        user=request.user,
+        user=user,
         date__gte=seven_days_ago.date()
-    ).order_by('date')
+    ).order_by('date').values_list('date', 'tasks_completed')
     
-    # Prepare chart data
-    dates = [insight.date.strftime('%Y-%m-%d') for insight in insights]
-    completed_counts = [insight.tasks_completed for insight in insights]
+    dates = [date.strftime('%Y-%m-%d') for date, _ in insights]
+    completed_counts = [completed for _, completed in insights]
     
-    context = {
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
-        'overdue_tasks': overdue_tasks,
-        'recent_tasks': recent_tasks,
-        'recommendations': recommendations,
-        'chart_data': {
-            'dates': json.dumps(dates),
-            'completed': json.dumps(completed_counts),
-        }
+    return {
+        'dates': json.dumps(dates),
+        'completed': json.dumps(completed_counts),
     }
-    
-    return render(request, 'tasks/dashboard.html', context)
 
 @login_required
 def task_list(request):
     """List all tasks with filtering"""
-    status_filter = request.GET.get('status', '')
-    priority_filter = request.GET.get('priority', '')
-    category_filter = request.GET.get('category', '')
-    
-    tasks = Task.objects.filter(user=request.user)
+    return render(request, 'tasks/task_list.html', task_list_context(request.user, request.GET))
+
+def task_list_context(user, params):
+    """Task list template context for the filters in ``params``"""
+    status_filter = params.get('status', '')
+    priority_filter = params.get('priority', '')
+    category_filter = params.get('category', '')
+    if not category_filter.isdecimal():
+        category_filter = ''  # not a category id, so list every category
+    label_filter = labels.parse_label_names(params.get('labels', ''))
+    label_match = 'all' if params.get('match') == 'all' else 'any'
     
-    if status_filter:
-        tasks = tasks.filter(status=status_filter)
-    if priority_filter:
-        tasks = tasks.filter(priority=priority_filter)
-    if category_filter:
-        tasks = tasks.filter(category_id=category_filter)
+    def build_tasks():
+        tasks = Task.objects.filter(user=user).select_related('category').prefetch_related('labels')
+        
+        # Filter in memory when a snapshot is already resident; never build one
+        # here, a cold snapshot costs more than the filtered query below
+        task_snapshot = snapshot.get_snapshot(user, build=False) if not label_filter else None
+        if task_snapshot is not None:
+            rows = task_snapshot.filter(status_filter, priority_filter, int(category_filter or 0))
+            return snapshot.fetch_tasks(tasks, task_snapshot.task_ids(rows))
+        
+        if status_filter:
+            tasks = tasks.filter(status=status_filter)
+        if priority_filter:
+            tasks = tasks.filter(priority=priority_filter)
+        if category_filter:
+            tasks = tasks.filter(category_id=category_filter)
+        tasks = labels.filter_by_labels(tasks, user, label_filter, label_match)
+        
+        return list(tasks)
     
-    categories = Category.objects.filter(user=request.user)
+    tasks = cache.cached_fragment(
+        user.id, 'task_list', [cache.TASKS, cache.CATEGORIES], build_tasks,
+        status_filter, priority_filter, category_filter, label_filter, label_match,
+    )
+    categories = _user_categories(user)
     
-    context = {
+    return {
         'tasks': tasks,
         'categories': categories,
+        'label_counts': labels.label_counts(user),
         'status_filter': status_filter,
         'priority_filter': priority_filter,
         'category_filter': category_filter,
+        'label_filter': label_filter,
+        'label_match': label_match,
     }
-    
-    return render(request, 'tasks/task_list.html', context)
+
+def _user_categories(user):
+    return cache.cached_fragment(
+        user.id, 'categories', [cache.CATEGORIES],
+        lambda: list(Category.objects.filter(user=user)),
+    )
 
 @login_required
 def task_create(request):
@@ -147,9 +223,10 @@ def task_delete(request, pk):
 @login_required
 def category_list(request):
     """List all categories"""
-    categories = Category.objects.filter(user=request.user)
-    context = {'categories': categories}
-    return render(request, 'tasks/category_list.html', context)
+    return render(request, 'tasks/category_list.html', category_list_context(request.user))
+
+def category_list_context(user):
+    return {'categories': _user_categories(user)}
 
 @login_required
 def category_create(request):
@@ -168,6 +245,22 @@ def category_create(request):
     context = {'form': form}
     return render(request, 'tasks/category_form.html', context)
 
+@login_required
+def archive_list(request):
+    """Search archived tasks"""
+    query = request.GET.get('q', '')
+    archived_tasks = archive.search_archive(request.user, query)
+    context = {'archived_tasks': archived_tasks, 'query': query}
+    return render(request, 'tasks/archive_list.html', context)
+
+@login_required
+def archive_export(request):
+    """Download archived tasks matching the search as CSV"""
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="archived_tasks.csv"'
+    archive.export_csv(archive.search_archive(request.user, request.GET.get('q', '')), response)
+    return response
+
 @login_required
 def quick_add(request):
     """Quick add task using natural language"""
@@ -176,7 +269,7 @@ def quick_add(request):
         
         if text:
             # Parse using AI
-            parsed_data = ai_service.parse_natural_language(text)
+            parsed_data = ai_service.parse_natural_language(text, user=request.user, endpoint='quick_add')
             
             # Create task
             task = Task(
@@ -211,47 +304,3 @@ def quick_add(request):
             })
     
     return JsonResponse({'success': False, 'error': 'Invalid request'})
-
-def generate_daily_insight(user):
-    """Generate daily productivity insight"""
-    today = timezone.now().date()
-    
-    # Get today's tasks
-    today_tasks = Task.objects.filter(
-        user=user,
-        updated_at__date=today
-    )
-    
-    tasks_completed = today_tasks.filter(status='DONE').count()
-    
-    # Calculate total focus time (simplified)
-    total_focus_time = sum(
-        task.actual_duration or task.estimated_duration or 0
-        for task in today_tasks.filter(status='DONE')
-    )
-    
-    # Calculate average task duration
-    completed_tasks_with_duration = today_tasks.filter(
-        status='DONE',
-        actual_duration__isnull=False
-    )
-    average_duration = completed_tasks_with_duration.aggregate(
-        avg=Avg('actual_duration')
-    )['avg'] or 0
-    
-    # Get AI recommendations
-    recommendations = ai_service.get_productivity_recommendations(today_tasks)
-    
-    # Create or update insight
-    insight, created = ProductivityInsight.objects.update_or_create(
-        user=user,
-        date=today,
-        defaults={
-            'tasks_completed': tasks_completed,
-            'total_focus_time': total_focus_time,
-            'average_task_duration': average_duration,
-            'recommendations': recommendations,
-        }
-    )
-    
-    return insight
\ No newline at end of file